@@ -10,6 +10,9 @@ from pyrogram.types import User
 from bot.config import config
 from bot.utils.logger import setup_logger
 from bot.handlers import register_handlers
+from bot.utils.idempotency import idempotency_store
+from bot.utils.file_id_cache import file_id_cache
+from bot.utils.uploader import uploader
 
 logger = setup_logger(__name__)
 
@@ -46,6 +49,9 @@ class TelegramBot:
             self.bot_info = await self.client.get_me()
             logger.info(f"Bot started: @{self.bot_info.username} ({self.bot_info.first_name})")
             
+            # Start the optional upload session pool
+            await uploader.start()
+            
             # Register all handlers
             register_handlers(self.client)
             logger.info("All handlers registered successfully")
@@ -57,6 +63,9 @@ class TelegramBot:
     async def stop(self):
         """Stop the bot gracefully."""
         try:
+            idempotency_store.save()
+            file_id_cache.save()
+            await uploader.stop()
             if self.client and self.is_running:
                 await self.client.stop()
                 self.is_running = False
@@ -131,7 +131,25 @@ STATUS = {
     'not_supported': '❌ Bu link dəstəklənmir. Instagram, TikTok və ya YouTube linkləri göndərin.',
     'invalid_link': '❌ Yanlış link formatı. Düzgün video linki göndərin.',
     'file_too_large': '❌ Fayl çox böyükdür. Daha kiçik video cəhd edin.',
-    'download_failed': '❌ Video yüklənə bilmədi. Linki yoxlayın və yenidən cəhd edin.'
+    'download_failed': '❌ Video yüklənə bilmədi. Linki yoxlayın və yenidən cəhd edin.',
+    'platform_down': '⛔ {platform} hazırda cavab vermir. Bir neçə dəqiqədən sonra yenidən cəhd edin.',
+    'cancel_button': '✖️ Ləğv et',
+    'cancelling': '⏹ Ləğv edilir...',
+    'cancelled': '⏹ Yükləmə ləğv edildi.',
+    'stage_timeout': '⏱️ Əməliyyat çox uzun çəkdi və dayandırıldı. Yenidən cəhd edin.',
+    'job_not_found': 'Bu yükləmə artıq bitib.',
+    'already_processing': '⏳ Bu sorğu artıq emal edilir.',
+    'transcode_busy': '⏳ Hazırda çox video sıxılır. Bir az sonra yenidən cəhd edin.',
+    'batch_progress': '📦 Linklər yüklənir: {done}/{total} hazırdır, {failed} uğursuz',
+    'batch_done': '✅ Bitdi: {total} linkdən {sent} video göndərildi, {failed} uğursuz.',
+    'bulk_started': '📥 Faylda {count} link tapıldı. Başlayırıq...',
+    'bulk_empty': '❌ Faylda dəstəklənən link tapılmadı.',
+    'bulk_busy': '⏳ Artıq işləyən toplu yükləməniz var. Zəhmət olmasa bitməsini gözləyin.',
+    'inline_hint': '🔗 TikTok, Instagram və ya YouTube linki yazın',
+    'inline_cached': '⚡ Dərhal göndər',
+    'inline_download': '⬇️ Şəxsi çatda yükləmək üçün toxunun',
+    'button_invalid': '❌ Bu düymə artıq etibarlı deyil. Zəhmət olmasa linki yenidən göndərin.',
+    'auto_quality': '⚙️ Yükləmə hazırda yavaş olduğu üçün {quality} keyfiyyətində göndərildi.'
 }
 
 # YouTube specific messages
@@ -150,7 +168,9 @@ PROGRESS = {
     'downloading': '⬇️ Yüklənir: {percentage}% ({size})',
     'processing': '⚙️ Emal edilir...',
     'uploading': '📤 Telegram-a göndərilir: {percentage}%',
-    'finalizing': '🎬 Tamamlanır...'
+    'finalizing': '🎬 Tamamlanır...',
+    'transcoding': '⚙️ Video Telegram üçün sıxılır: {percentage}%',
+    'extracting_audio': '🎵 MP3-ə çevrilir ({bitrate} kbps)...'
 }
 
 # Platform names
@@ -131,7 +131,25 @@ STATUS = {
     'not_supported': '❌ This link is not supported. Send Instagram, TikTok or YouTube links.',
     'invalid_link': '❌ Invalid link format. Send a proper video link.',
     'file_too_large': '❌ File is too large. Try a smaller video.',
-    'download_failed': '❌ Could not download video. Check the link and try again.'
+    'download_failed': '❌ Could not download video. Check the link and try again.',
+    'platform_down': '⛔ {platform} is not responding right now. Please try again in a few minutes.',
+    'cancel_button': '✖️ Cancel',
+    'cancelling': '⏹ Cancelling...',
+    'cancelled': '⏹ Download cancelled.',
+    'stage_timeout': '⏱️ The job took too long and was stopped. Please try again.',
+    'job_not_found': 'This download has already finished.',
+    'already_processing': '⏳ This request is already being processed.',
+    'transcode_busy': '⏳ Too many videos are being compressed right now. Please try again later.',
+    'batch_progress': '📦 Downloading links: {done}/{total} done, {failed} failed',
+    'batch_done': '✅ Finished: {sent} videos sent from {total} links, {failed} failed.',
+    'bulk_started': '📥 Found {count} links in the file. Starting...',
+    'bulk_empty': '❌ No supported links found in the file.',
+    'bulk_busy': '⏳ You already have a bulk download running. Please wait for it to finish.',
+    'inline_hint': '🔗 Type a TikTok, Instagram or YouTube link',
+    'inline_cached': '⚡ Send instantly',
+    'inline_download': '⬇️ Tap to download in private chat',
+    'button_invalid': '❌ This button is no longer valid. Please send the link again.',
+    'auto_quality': '⚙️ Sent in {quality} because uploads are slow right now.'
 }
 
 # YouTube specific messages
@@ -150,7 +168,9 @@ PROGRESS = {
     'downloading': '⬇️ Downloading: {percentage}% ({size})',
     'processing': '⚙️ Processing...',
     'uploading': '📤 Uploading to Telegram: {percentage}%',
-    'finalizing': '🎬 Finalizing...'
+    'finalizing': '🎬 Finalizing...',
+    'transcoding': '⚙️ Compressing video to fit Telegram: {percentage}%',
+    'extracting_audio': '🎵 Converting to MP3 ({bitrate} kbps)...'
 }
 
 # Platform names
@@ -131,7 +131,25 @@ STATUS = {
     'not_supported': '❌ Эта ссылка не поддерживается. Отправьте ссылку Instagram, TikTok или YouTube.',
     'invalid_link': '❌ Неверный формат ссылки. Отправьте правильную ссылку на видео.',
     'file_too_large': '❌ Файл слишком большой. Попробуйте видео поменьше.',
-    'download_failed': '❌ Не удалось скачать видео. Проверьте ссылку и попробуйте снова.'
+    'download_failed': '❌ Не удалось скачать видео. Проверьте ссылку и попробуйте снова.',
+    'platform_down': '⛔ {platform} сейчас не отвечает. Попробуйте снова через несколько минут.',
+    'cancel_button': '✖️ Отмена',
+    'cancelling': '⏹ Отмена...',
+    'cancelled': '⏹ Загрузка отменена.',
+    'stage_timeout': '⏱️ Задача выполнялась слишком долго и была остановлена. Попробуйте снова.',
+    'job_not_found': 'Эта загрузка уже завершена.',
+    'already_processing': '⏳ Этот запрос уже обрабатывается.',
+    'transcode_busy': '⏳ Сейчас сжимается слишком много видео. Попробуйте позже.',
+    'batch_progress': '📦 Загрузка ссылок: {done}/{total} готово, {failed} с ошибкой',
+    'batch_done': '✅ Готово: отправлено {sent} видео из {total} ссылок, {failed} с ошибкой.',
+    'bulk_started': '📥 В файле найдено ссылок: {count}. Начинаем...',
+    'bulk_empty': '❌ В файле нет поддерживаемых ссылок.',
+    'bulk_busy': '⏳ У вас уже идёт массовая загрузка. Дождитесь её завершения.',
+    'inline_hint': '🔗 Введите ссылку TikTok, Instagram или YouTube',
+    'inline_cached': '⚡ Отправить мгновенно',
+    'inline_download': '⬇️ Нажмите, чтобы скачать в личном чате',
+    'button_invalid': '❌ Эта кнопка больше не действует. Отправьте ссылку ещё раз.',
+    'auto_quality': '⚙️ Отправлено в {quality}, так как загрузка сейчас медленная.'
 }
 
 # YouTube specific messages
@@ -150,7 +168,9 @@ PROGRESS = {
     'downloading': '⬇️ Загрузка: {percentage}% ({size})',
     'processing': '⚙️ Обработка...',
     'uploading': '📤 Отправка в Telegram: {percentage}%',
-    'finalizing': '🎬 Завершение...'
+    'finalizing': '🎬 Завершение...',
+    'transcoding': '⚙️ Сжатие видео для Telegram: {percentage}%',
+    'extracting_audio': '🎵 Конвертация в MP3 ({bitrate} кбит/с)...'
 }
 
 # Platform names
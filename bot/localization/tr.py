@@ -131,7 +131,25 @@ STATUS = {
     'not_supported': '❌ Bu link desteklenmiyor. Instagram, TikTok veya YouTube linki gönderin.',
     'invalid_link': '❌ Geçersiz link formatı. Düzgün bir video linki gönderin.',
     'file_too_large': '❌ Dosya çok büyük. Daha küçük bir video deneyin.',
-    'download_failed': '❌ Video indirilemedi. Linki kontrol edin ve tekrar deneyin.'
+    'download_failed': '❌ Video indirilemedi. Linki kontrol edin ve tekrar deneyin.',
+    'platform_down': '⛔ {platform} şu anda yanıt vermiyor. Lütfen birkaç dakika sonra tekrar deneyin.',
+    'cancel_button': '✖️ İptal',
+    'cancelling': '⏹ İptal ediliyor...',
+    'cancelled': '⏹ İndirme iptal edildi.',
+    'stage_timeout': '⏱️ İşlem çok uzun sürdü ve durduruldu. Lütfen tekrar deneyin.',
+    'job_not_found': 'Bu indirme zaten tamamlandı.',
+    'already_processing': '⏳ Bu istek zaten işleniyor.',
+    'transcode_busy': '⏳ Şu anda çok fazla video sıkıştırılıyor. Lütfen daha sonra tekrar deneyin.',
+    'batch_progress': '📦 Bağlantılar indiriliyor: {done}/{total} tamamlandı, {failed} başarısız',
+    'batch_done': '✅ Tamamlandı: {total} bağlantıdan {sent} video gönderildi, {failed} başarısız.',
+    'bulk_started': '📥 Dosyada {count} bağlantı bulundu. Başlatılıyor...',
+    'bulk_empty': '❌ Dosyada desteklenen bağlantı bulunamadı.',
+    'bulk_busy': '⏳ Zaten devam eden bir toplu indirmeniz var. Lütfen bitmesini bekleyin.',
+    'inline_hint': '🔗 Bir TikTok, Instagram veya YouTube bağlantısı yazın',
+    'inline_cached': '⚡ Hemen gönder',
+    'inline_download': '⬇️ Özel sohbette indirmek için dokunun',
+    'button_invalid': '❌ Bu düğme artık geçerli değil. Lütfen bağlantıyı tekrar gönderin.',
+    'auto_quality': '⚙️ Yüklemeler şu anda yavaş olduğu için {quality} kalitesinde gönderildi.'
 }
 
 # YouTube specific messages
@@ -150,7 +168,9 @@ PROGRESS = {
     'downloading': '⬇️ İndiriliyor: {percentage}% ({size})',
     'processing': '⚙️ İşleniyor...',
     'uploading': '📤 Telegram\'a gönderiliyor: {percentage}%',
-    'finalizing': '🎬 Tamamlanıyor...'
+    'finalizing': '🎬 Tamamlanıyor...',
+    'transcoding': '⚙️ Video Telegram için sıkıştırılıyor: {percentage}%',
+    'extracting_audio': '🎵 MP3\'e dönüştürülüyor ({bitrate} kbps)...'
 }
 
 # Platform names
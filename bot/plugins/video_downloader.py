@@ -1,16 +1,39 @@
 
 import time
+import copy
 import glob
 import os
+import re
+import shutil
 import tempfile
+import threading
 import asyncio
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 from pyrogram import filters
 from pyrogram.client import Client
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from pyrogram.types import Message
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, InputMediaPhoto, InputMediaVideo
+from pyrogram.types import InlineQuery, InlineQueryResultCachedVideo, Message
+from bot.config import config
 from bot.utils.logger import setup_logger
-from bot.utils.decorators import error_handler, track_usage, typing_action
+from bot.utils.cookie_manager import cookie_manager
+from bot.utils.hedging import hedged_race, LatencyTracker, ProfileScoreboard
+from bot.utils.proxy_pool import proxy_pool
+from bot.utils.idempotency import idempotency_store
+from bot.utils.job_manager import job_manager, JobCancelled
+from bot.utils.media import DownloadResult, clean_title, prepare_for_streaming, probe_video, split_video
+from bot.utils.thumbnails import thumbnail_cache
+from bot.utils.transcoder import transcoder, TranscodeQueueFull
+from bot.utils.uploader import uploader
+from bot.utils.status_updater import status_updater
+from bot.utils.audio import audio_extractor
+from bot.utils.file_id_cache import file_id_cache
+from bot.utils.source_cache import source_cache
+from bot.utils.fingerprint import content_fingerprint
+from bot.utils.speculation import speculative_tasks
+from bot.utils import callback_data
+from bot.utils.resilience import retry_async, circuit_breakers, CircuitOpenError
+from bot.utils.decorators import error_handler, own_task, track_usage, typing_action
 from bot.utils.language_manager import language_manager
 from bot.utils.stats_manager import stats_manager
 import yt_dlp
@@ -19,16 +42,80 @@ import instaloader
 
 
 logger = setup_logger(__name__)
-youtube_temp_links = {}
+URL_RE = re.compile(r"https?://[^\s<>\"']+")
+YOUTUBE_ID_RE = re.compile(r"(?:v=|youtu\.be/|shorts/|embed/|live/)([A-Za-z0-9_-]{11})")
+INSTAGRAM_SHORTCODE_RE = re.compile(r"instagram\.com/(?:[^/?#]+/)?(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)")
+TIKTOK_ID_RE = re.compile(r"tiktok\.com/(?:@[^/?#]*/)?video/(\d+)")
+
+# YouTube quality tiers: tier -> (height cap, yt-dlp format)
+YOUTUBE_TIERS = {
+    "360": (360, "bestvideo[height<=360]+bestaudio/best[height<=360]/best"),
+    "720": (720, "bestvideo[height<=720]+bestaudio/best[height<=720]/best"),
+    "best": (None, "bestvideo+bestaudio/best"),
+}
+
+# Canonical URLs of media IDs, used by inline-mode deep links
+MEDIA_URLS = {
+    "youtube": "https://youtu.be/{}",
+    "instagram": "https://www.instagram.com/p/{}/",
+    "tiktok": "https://www.tiktok.com/@/video/{}",
+}
+
+# Header profiles used for TikTok requests
+TIKTOK_HEADER_PROFILES = {
+    'ios_safari': {
+        'user_agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
+        'headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
+        },
+    },
+    'android_chrome': {
+        'user_agent': 'Mozilla/5.0 (Linux; Android 12; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
+        'headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1'
+        },
+    },
+    'desktop_chrome': {
+        'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'headers': {
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate',
+            'Referer': 'https://www.tiktok.com/',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1'
+        },
+    },
+}
+tiktok_profiles = ProfileScoreboard(list(TIKTOK_HEADER_PROFILES))
+tiktok_latency = LatencyTracker()
+
 class VideoDownloaderPlugin:
     def __init__(self, client: Client):
         self.client = client
         self.name = "Video Downloader"
         self.version = "1.0.0"
         self.description = "Download videos from TikTok, Instagram, and YouTube"
+        self.bulk_users = set()
+        # media_id -> background download started by an inline query
+        self.prefetches: Dict[str, asyncio.Task] = {}
+        # Download workers get their own pool, so hedged attempts can't starve
+        # other executor users (fingerprints, thumbnails, state syncs)
+        self.executor = ThreadPoolExecutor(max_workers=config.DOWNLOAD_THREADS, thread_name_prefix="download")
 
     def register(self):
         self._register_download_handler()
+        self._register_bulk_handler()
+        self._register_inline_handler()
+        self._register_cancel_callback()
         self._register_youtube_callback()
         logger.info(f"Plugin '{self.name}' registered successfully")
 
@@ -42,376 +129,1710 @@ class VideoDownloaderPlugin:
         video_url_filter = filters.create(is_video_url)
 
         @self.client.on_message(filters.private & filters.text & video_url_filter)
+        @own_task
         @error_handler
         @track_usage
         @typing_action
         async def handle_video_download(client: Client, message: Message):
-            url = message.text.strip()
+            urls = self._extract_urls(message.text)
+            url = urls[0] if urls else message.text.strip()
             user = message.from_user
 
+            update_key = f"msg:{message.chat.id}:{message.id}"
+            if not idempotency_store.claim(update_key):
+                return
+
             logger.info(f"Video downloader received message from {user.id}: {url[:50]}...")
             processing_text = language_manager.get_text(user.id, 'status', 'processing')
             processing_msg = await message.reply(processing_text)
+            job = None
 
             try:
+                if len(urls) > 1:
+                    await self._run_batch(client, message.chat.id, user.id, urls, processing_msg)
+                    idempotency_store.complete(update_key)
+                    return
+
                 if "tiktok.com" in url.lower():
-                    downloading_text = language_manager.get_text(user.id, 'status', 'downloading', platform="TikTok")
-                    await processing_msg.edit_text(downloading_text)
-                    file_path = await self._download_tiktok(url, processing_msg)
                     platform = "TikTok"
+                    download = lambda: self._download_tiktok(url, processing_msg, job)
 
                 elif "instagram.com" in url.lower():
-                    downloading_text = language_manager.get_text(user.id, 'status', 'downloading', platform="Instagram")
-                    await processing_msg.edit_text(downloading_text)
-                    file_path = await self._download_instagram(url, processing_msg)
+                    sent, post = await self._send_instagram_carousel(client, message.chat.id, user, url, processing_msg)
+                    if sent:
+                        idempotency_store.complete(update_key)
+                        return
                     platform = "Instagram"
+                    download = lambda: self._download_instagram(url, processing_msg, job, post)
 
                 elif "youtu.be" in url.lower() or "youtube.com" in url.lower():
-                    youtube_temp_links[message.id] = {
-                        "url": url,
-                        "user_id": user.id
-                    }
-                    buttons = InlineKeyboardMarkup([
-                        [
-                            InlineKeyboardButton("📹 Video", callback_data=f"yt_video|{message.id}"),
-                            InlineKeyboardButton("🎵 MP3", callback_data=f"yt_audio|{message.id}")
-                        ]
-                    ])
+                    media_id = self._youtube_media_id(url)
+                    if not media_id:
+                        not_supported_text = language_manager.get_text(user.id, 'status', 'not_supported')
+                        await processing_msg.edit_text(not_supported_text)
+                        idempotency_store.complete(update_key)
+                        return
+                    # The same metadata sizes the buttons and later drives the download
+                    video_id = media_id.split(":", 1)[1]
+                    info = await self._youtube_info(video_id)
+                    buttons = self._youtube_keyboard(user.id, video_id, info)
                     await processing_msg.edit_text("🎬 YouTube yükləmə formatını seçin:", reply_markup=buttons)
+                    idempotency_store.complete(update_key)
                     return
 
                 else:
                     not_supported_text = language_manager.get_text(user.id, 'status', 'not_supported')
                     await processing_msg.edit_text(not_supported_text)
+                    idempotency_store.complete(update_key)
                     return
 
-                if file_path and os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    formatted_size = language_manager.format_size(file_size, user.id)
-                    video_title = await self._extract_video_title(url, platform)
-
-                    uploading_text = language_manager.get_text(user.id, 'progress', 'uploading', percentage=0)
-                    await processing_msg.edit_text(uploading_text)
-
-                    async def upload_progress_callback(current, total):
-                        percentage = int((current / total) * 100)
-                        progress_bar = language_manager.create_progress_bar(percentage)
-                        text = language_manager.get_text(user.id, 'progress', 'uploading', percentage=percentage)
-                        if percentage % 10 == 0:
-                            try:
-                                await processing_msg.edit_text(f"📤 {text}: {progress_bar}\n📁 {formatted_size}")
-                            except:
-                                pass
-
-                    platform_text = platform.title()
-                    promo_text = self._get_promotional_text(user.id)
-                    user_lang = language_manager.get_user_language(user.id)
-
-                    if user_lang == 'az':
-                        caption = f"📹 {platform_text}dan yükləndi"
-                        if video_title:
-                            caption += f"\n🎬 {video_title}"
-                        caption += f"\n📁 Ölçü: {formatted_size}\n\n{promo_text}"
-                    elif user_lang == 'en':
-                        caption = f"📹 Downloaded from {platform_text}"
-                        if video_title:
-                            caption += f"\n🎬 {video_title}"
-                        caption += f"\n📁 Size: {formatted_size}\n\n{promo_text}"
-                    elif user_lang == 'tr':
-                        caption = f"📹 {platform_text}'dan indirildi"
-                        if video_title:
-                            caption += f"\n🎬 {video_title}"
-                        caption += f"\n📁 Boyut: {formatted_size}\n\n{promo_text}"
-                    elif user_lang == 'ru':
-                        caption = f"📹 Загружено с {platform_text}"
-                        if video_title:
-                            caption += f"\n🎬 {video_title}"
-                        caption += f"\n📁 Размер: {formatted_size}\n\n{promo_text}"
-                    else:
-                        caption = f"📹 Downloaded from {platform_text}"
-                        if video_title:
-                            caption += f"\n🎬 {video_title}"
-                        caption += f"\n📁 Size: {formatted_size}\n\n{promo_text}"
-
-                    await message.reply_video(
-                        video=file_path,
-                        caption=caption,
-                        progress=upload_progress_callback
-                    )
+                async with job_manager.run(user.id, message.chat.id) as job:
+                    cancel_markup = self._cancel_markup(job, user.id)
+                    downloading_text = language_manager.get_text(user.id, 'status', 'downloading', platform=platform)
+                    await status_updater.edit(processing_msg, downloading_text, reply_markup=cancel_markup)
 
-                    stats_manager.add_download(platform.lower())
+                    job.enter_stage("download")
+                    result = await self._download_resilient(platform.lower(), download)
 
-                    try:
-                        os.remove(file_path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"Failed to cleanup file {file_path}: {cleanup_error}")
+                    if result and result.exists():
+                        video_title = result.title
+                        if not video_title:
+                            job.enter_stage("extract")
+                            video_title = await self._extract_video_title(url, platform)
 
-                    await processing_msg.delete()
-                    await self._notify_admin_download(user, platform, url, video_title)
+                        # The same clip is often reposted under other URLs
+                        fingerprint = await content_fingerprint(result.path)
+                        cached_key = await self._match_content(fingerprint)
+                        sent_cached = False
+                        if cached_key:
+                            caption = self._build_caption(user.id, platform, video_title, language_manager.format_size(result.size, user.id))
+                            job.enter_stage("upload")
+                            sent_cached = await self._send_cached(client, message.chat.id, cached_key, caption)
 
-                    logger.info(f"Successfully downloaded and sent {platform} video for user {message.from_user.id}")
-                else:
-                    download_failed = language_manager.get_text(user.id, 'status', 'download_failed')
-                    await processing_msg.edit_text(download_failed)
+                        if not sent_cached:
+                            job.enter_stage("postprocess")
+                            await self._prepare_video(result)
+                            parts = await self._fit_upload_limit(result, processing_msg, user.id, job, cancel_markup)
+                            if not parts:
+                                too_large_text = language_manager.get_text(user.id, 'status', 'file_too_large')
+                                await status_updater.edit(processing_msg, too_large_text)
+                                idempotency_store.complete(update_key)
+                                return
+                            file_size = result.size
+                            formatted_size = language_manager.format_size(file_size, user.id)
+
+                            uploading_text = language_manager.get_text(user.id, 'progress', 'uploading', percentage=0)
+                            await status_updater.edit(processing_msg, uploading_text, reply_markup=cancel_markup)
+
+                            async def upload_progress_callback(current, total):
+                                if job.cancelled:
+                                    client.stop_transmission()
+                                job.report_progress()
+                                percentage = int((current / total) * 100)
+                                progress_bar = language_manager.create_progress_bar(percentage)
+                                text = language_manager.get_text(user.id, 'progress', 'uploading', percentage=percentage)
+                                status_updater.update(processing_msg, f"📤 {text}: {progress_bar}\n📁 {formatted_size}", reply_markup=cancel_markup)
+
+                            caption = self._build_caption(user.id, platform, video_title, formatted_size)
+
+                            job.enter_stage("upload")
+                            if len(parts) > 1:
+                                await self._send_parts(client, message.chat.id, parts, caption, processing_msg, user.id, job, cancel_markup)
+                            else:
+                                sent = await uploader.send_video(client, message.chat.id, result, caption, upload_progress_callback)
+                                await self._remember_video(result, sent.video.file_id if sent and sent.video else None, fingerprint)
+                        job.check_cancelled()
+
+                        stats_manager.add_download(platform.lower())
+
+                        idempotency_store.complete(update_key)
+                        status_updater.forget(processing_msg)
+                        await processing_msg.delete()
+                        await self._notify_admin_download(user, platform, url, video_title)
+
+                        logger.info(f"Successfully downloaded and sent {platform} video for user {message.from_user.id}")
+                    else:
+                        download_failed = language_manager.get_text(user.id, 'status', 'download_failed')
+                        await status_updater.edit(processing_msg, download_failed)
+                        idempotency_store.complete(update_key)
+
+            except (asyncio.CancelledError, JobCancelled):
+                if not job or not job.cancelled:
+                    raise
+                idempotency_store.complete(update_key)
+                await self._report_stopped(processing_msg, job, user.id)
+
+            except TranscodeQueueFull:
+                logger.warning(f"Transcode queue full, rejecting video for user {message.from_user.id}")
+                idempotency_store.complete(update_key)
+                await status_updater.edit(processing_msg, language_manager.get_text(user.id, 'status', 'transcode_busy'))
+
+            except CircuitOpenError as e:
+                logger.warning(f"Fast-failing download for user {message.from_user.id}: {e}")
+                idempotency_store.complete(update_key)
+                platform_down = language_manager.get_text(user.id, 'status', 'platform_down', platform=e.platform.title())
+                await status_updater.edit(processing_msg, platform_down)
 
             except Exception as e:
                 logger.error(f"Video download error for user {message.from_user.id}: {e}", exc_info=True)
-                await processing_msg.edit_text(f"❌ Error downloading video: {str(e)}")
+                idempotency_store.complete(update_key)
+                await status_updater.edit(processing_msg, f"❌ Error downloading video: {str(e)}")
+
+            finally:
+                status_updater.forget(processing_msg)
+
+    def _register_bulk_handler(self):
+        def is_url_list(_, __, message):
+            document = message.document
+            if not document:
+                return False
+            name = (document.file_name or "").lower()
+            return name.endswith((".txt", ".csv")) or document.mime_type in ("text/plain", "text/csv")
+
+        # Registered before the generic document handler, so URL lists land here
+        @self.client.on_message(filters.private & filters.document & filters.create(is_url_list))
+        @error_handler
+        @track_usage
+        async def handle_bulk_file(client: Client, message: Message):
+            user = message.from_user
+            update_key = f"msg:{message.chat.id}:{message.id}"
+            if not idempotency_store.claim(update_key):
+                return
+            if user.id in self.bulk_users:
+                idempotency_store.complete(update_key)
+                return await message.reply(language_manager.get_text(user.id, 'status', 'bulk_busy'))
+            # Claimed before any await, so a second file on another worker sees it
+            self.bulk_users.add(user.id)
+
+            status_msg = None
+            try:
+                logger.info(f"Bulk file {message.document.file_name} received from {user.id}")
+                status_msg = await message.reply(language_manager.get_text(user.id, 'status', 'processing'))
+                urls = await self._read_url_list(client, message)
+                if not urls:
+                    await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'bulk_empty'))
+                    return
+                await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'bulk_started', count=len(urls)))
+                await self._run_batch(client, message.chat.id, user.id, urls, status_msg, concurrency=config.BULK_CONCURRENCY)
+            except Exception as e:
+                logger.error(f"Bulk download error for user {user.id}: {e}", exc_info=True)
+                if status_msg:
+                    await status_updater.edit(status_msg, f"❌ Error downloading video: {str(e)}")
+            finally:
+                self.bulk_users.discard(user.id)
+                idempotency_store.complete(update_key)
+                if status_msg:
+                    status_updater.forget(status_msg)
+
+    async def _read_url_list(self, client: Client, message: Message) -> List[str]:
+        """Stream a text document and collect its supported URLs, deduplicated and capped."""
+        if message.document.file_size and message.document.file_size > config.BULK_MAX_FILE_SIZE:
+            logger.warning(f"Bulk file from {message.from_user.id} is too large ({message.document.file_size} bytes)")
+            return []
+
+        urls: List[str] = []
+        seen = set()
+        remainder = ""
+        async for chunk in client.stream_media(message):
+            lines = (remainder + chunk.decode("utf-8", errors="ignore")).split("\n")
+            remainder = lines.pop()
+            for line in lines:
+                # CSV cells are separated by commas, which supported URLs never contain
+                for url in self._extract_urls(line.replace(",", " ")):
+                    if url not in seen:
+                        seen.add(url)
+                        urls.append(url)
+            if len(urls) >= config.BULK_MAX_URLS:
+                break
+        for url in self._extract_urls(remainder.replace(",", " ")):
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+        return urls[:config.BULK_MAX_URLS]
+
+    def _register_inline_handler(self):
+        @self.client.on_inline_query()
+        @error_handler
+        async def handle_inline_query(client: Client, inline_query: InlineQuery):
+            user_id = inline_query.from_user.id
+            urls = self._extract_urls(inline_query.query)
+            if not urls:
+                hint = language_manager.get_text(user_id, 'status', 'inline_hint')
+                return await inline_query.answer([], cache_time=300, switch_pm_text=hint, switch_pm_parameter="inline")
+
+            url = urls[0]
+            media_id = self._canonical_media_id(url)
+            entry = file_id_cache.get(file_id_cache.key(media_id, "video")) if media_id else None
+            if entry:
+                result = InlineQueryResultCachedVideo(
+                    entry["file_id"],
+                    title=entry.get("title") or self._detect_platform(url).title(),
+                    description=language_manager.get_text(user_id, 'status', 'inline_cached'),
+                    caption=self._cached_caption(user_id, self._detect_platform(url), entry),
+                )
+                # Captions are in the user's language
+                return await inline_query.answer([result], cache_time=60, is_personal=True)
+
+            if media_id and config.INLINE_PREFETCH:
+                self._start_prefetch(client, user_id, url, media_id)
+            download_text = language_manager.get_text(user_id, 'status', 'inline_download')
+            parameter = "dl_" + media_id.replace(":", "_", 1) if media_id else "inline"
+            await inline_query.answer([], cache_time=0, is_personal=True,
+                                      switch_pm_text=download_text, switch_pm_parameter=parameter)
+
+        def is_download_link(_, __, message):
+            return bool(message.command) and len(message.command) > 1 and message.command[1].startswith("dl_")
+
+        # Runs before the regular /start handler, which is skipped for these links
+        @self.client.on_message(filters.private & filters.command("start") & filters.create(is_download_link), group=-1)
+        async def handle_download_link(client: Client, message: Message):
+            await self._serve_download_link(client, message)
+            message.stop_propagation()
+
+    @error_handler
+    @track_usage
+    async def _serve_download_link(self, client: Client, message: Message):
+        """Send the video behind an inline-mode "download in private chat" link."""
+        user = message.from_user
+        platform, _, ident = message.command[1][3:].partition("_")
+        if platform not in MEDIA_URLS or not ident:
+            return
+        update_key = f"msg:{message.chat.id}:{message.id}"
+        if not idempotency_store.claim(update_key):
+            return
+
+        media_id = f"{platform}:{ident}"
+        cache_key = file_id_cache.key(media_id, "video")
+        status_msg = await message.reply(language_manager.get_text(user.id, 'status', 'processing'))
+        try:
+            prefetch = self.prefetches.get(media_id)
+            if prefetch:
+                # Wait for it without inheriting its cancellation
+                await asyncio.wait([prefetch])
+            entry = file_id_cache.get(cache_key)
+            sent = bool(entry) and await self._send_cached(client, message.chat.id, cache_key,
+                                                           self._cached_caption(user.id, platform, entry))
+            if not sent:
+                items, job = await self._run_item(client, message.chat.id, user.id, MEDIA_URLS[platform].format(ident))
+                if job is not None:
+                    return await self._report_stopped(status_msg, job, user.id)
+                sent = bool(items) and await self._send_album(client, message.chat.id, items) > 0
+            if sent:
+                await status_msg.delete()
+            else:
+                await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'download_failed'))
+        except CircuitOpenError as e:
+            platform_down = language_manager.get_text(user.id, 'status', 'platform_down', platform=e.platform.title())
+            await status_updater.edit(status_msg, platform_down)
+        except TranscodeQueueFull:
+            await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'transcode_busy'))
+        except Exception as e:
+            logger.error(f"Download link error for user {user.id}: {e}", exc_info=True)
+            await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'download_failed'))
+        finally:
+            idempotency_store.complete(update_key)
+            status_updater.forget(status_msg)
+
+    def _start_prefetch(self, client: Client, user_id: int, url: str, media_id: str) -> Optional[asyncio.Task]:
+        """Start a background download of an uncached inline-query video, once per media."""
+        task = self.prefetches.get(media_id)
+        if task and not task.done():
+            return task
+        if len(self.prefetches) >= config.INLINE_PREFETCH_MAX:
+            logger.info(f"Inline prefetch limit reached, not prefetching {media_id}")
+            return None
+
+        task = asyncio.create_task(self._prefetch(client, user_id, url, media_id))
+        self.prefetches[media_id] = task
+        task.add_done_callback(lambda _: self.prefetches.pop(media_id, None))
+        return task
+
+    async def _prefetch(self, client: Client, user_id: int, url: str, media_id: str):
+        """
+        Download and upload a video without sending it, caching its file ID.
+
+        Runs as a normal job of the requesting user, so prefetches share the
+        same fair-share limits as interactive downloads.
+        """
+        platform = self._detect_platform(url)
+        try:
+            async with job_manager.run(user_id, user_id) as job:
+                job.enter_stage("download")
+                result = await self._download_resilient(platform, lambda: self._download_for_platform(url, platform, job))
+                if not result or not result.exists():
+                    return
+                result.media_id = result.media_id or media_id
+                fingerprint = await content_fingerprint(result.path)
+
+                job.enter_stage("postprocess")
+                await self._prepare_video(result)
+                parts = await self._fit_upload_limit(result, None, user_id, job)
+                # Split videos can't be a single inline result
+                if len(parts) != 1:
+                    return
+
+                job.enter_stage("upload")
+                file_id = await uploader.upload_video(client, user_id, result)
+                await self._remember_video(result, file_id, fingerprint)
+                logger.info(f"Prefetched {media_id} for inline mode")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Inline prefetch of {media_id} failed: {e}")
+
+    def _cached_caption(self, user_id: int, platform: str, entry: dict) -> str:
+        """Caption for re-sending a cached video."""
+        if entry.get("size"):
+            return self._build_caption(user_id, platform, entry.get("title"),
+                                       language_manager.format_size(entry["size"], user_id))
+        return entry.get("title") or ""
+
+    def _register_cancel_callback(self):
+        @self.client.on_callback_query(filters.regex(r"^cancel\|"))
+        async def cancel_job_callback(client, callback_query):
+            user_id = callback_query.from_user.id
+            job_id = callback_query.data.split("|", 1)[1]
+
+            if job_manager.cancel(job_id, user_id):
+                await callback_query.answer(language_manager.get_text(user_id, 'status', 'cancelling'))
+            else:
+                await callback_query.answer(language_manager.get_text(user_id, 'status', 'job_not_found'), show_alert=True)
 
     def _register_youtube_callback(self):
-        @self.client.on_callback_query()
+        @self.client.on_callback_query(filters.regex(r"^yt_"))
+        @own_task
         async def youtube_format_callback(client, callback_query):
             data = callback_query.data
-            if not data.startswith("yt_"):
-                return
+            user_id = callback_query.from_user.id
 
             try:
-               action, msg_id = data.split("|", 1)
-               msg_id = int(msg_id)
-            except:
-                return await callback_query.message.edit_text("❌ Format xətası!")
-
-            video_data = youtube_temp_links.get(msg_id)
-            if not video_data:
-                return await callback_query.message.edit_text("❌ Keçici məlumat tapılmadı.")
+                action, video_id, *options = callback_data.unpack(data)
+                option = options[0] if options else None
+                bitrate = int(option) if action == "yt_audio" and option else config.AUDIO_DEFAULT_BITRATE
+            except (TypeError, ValueError):
+                # Unsigned, tampered with, or a button from before signed callbacks
+                invalid_text = language_manager.get_text(user_id, 'status', 'button_invalid')
+                return await callback_query.answer(invalid_text, show_alert=True)
 
-            url = video_data["url"]
-            user_id = video_data["user_id"]
+            url = MEDIA_URLS["youtube"].format(video_id)
             message = callback_query.message
+            # The picker doubles as the status message and is put back when done
+            picker_text, picker_markup = message.text, message.reply_markup
+            job = None
+
+            # A redelivered callback has the same ID; a double tap hits the same button.
+            # The button key only blocks while its job runs: pressing a finished
+            # button again is answered from the file ID cache.
+            query_key = f"cbq:{callback_query.id}"
+            button_key = f"btn:{message.chat.id}:{message.id}:{data}"
+            if not idempotency_store.claim(query_key):
+                return
+            if not idempotency_store.claim(button_key):
+                idempotency_store.complete(query_key)
+                return await callback_query.answer(language_manager.get_text(user_id, 'status', 'already_processing'))
 
             await callback_query.answer("Yükləmə başlayır...")
             format_type = "mp4" if action == "yt_video" else "mp3"
-            downloading_text = language_manager.get_text(user_id, 'status', 'downloading', platform="YouTube")
-            await message.edit_text(downloading_text)
+            if bitrate not in config.AUDIO_BITRATES:
+                bitrate = config.AUDIO_DEFAULT_BITRATE
+            tier = option if format_type == "mp4" and option in YOUTUBE_TIERS else "best"
+            media_id = f"youtube:{video_id}"
+            # "best" shares its entry with inline mode and plain link downloads
+            variant = f"mp3:{bitrate}" if format_type == "mp3" else ("video" if tier == "best" else f"video:{tier}")
+            cache_key = file_id_cache.key(media_id, variant)
+            quality_note = None
 
             try:
-                file_path = await self._download_youtube(url, message, format_type=format_type)
-
-                if file_path and os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    formatted_size = language_manager.format_size(file_size, user_id)
-                    video_title = await self._extract_video_title(url, "YouTube")
-                    uploading_text = language_manager.get_text(user_id, 'progress', 'uploading', percentage=0)
-                    await message.edit_text(uploading_text)
-
-                    async def upload_progress(current, total):
-                        percentage = int((current / total) * 100)
-                        bar = language_manager.create_progress_bar(percentage)
-                        text = language_manager.get_text(user_id, 'progress', 'uploading', percentage=percentage)
-                        if percentage % 10 == 0:
-                            try:
-                                await message.edit_text(f"📤 {text}: {bar}\n📁 {formatted_size}")
-                            except:
-                                pass
-
-                    await client.send_document(
-                        chat_id=message.chat.id,
-                        document=file_path,
-                        caption=video_title,
-                        progress=upload_progress
-                    )
+                if await self._send_cached(client, message.chat.id, cache_key):
+                    idempotency_store.release(button_key)
+                    return
 
-                    try:
-                        os.remove(file_path)
-                    except Exception as cleanup_error:
-                        logger.warning(f"Failed to cleanup YouTube file: {cleanup_error}")
+                async with job_manager.run(user_id, message.chat.id) as job:
+                    cancel_markup = self._cancel_markup(job, user_id)
 
-                    youtube_temp_links.pop(msg_id, None)
+                    # Audio can be cut from a video downloaded moments ago
+                    source = source_cache.get(media_id) if format_type == "mp3" else None
+                    result = source
+                    if result is None:
+                        downloading_text = language_manager.get_text(user_id, 'status', 'downloading', platform="YouTube")
+                        await status_updater.edit(message, downloading_text, reply_markup=cancel_markup)
 
-                else:
-                    await message.edit_text(f"❌ Yükləmə uğursuz oldu. Fayl tapılmadı.\n`file_path`: {file_path}\n`mövcudluq`: {os.path.exists(file_path) if file_path else 'None'}")
+                        job.enter_stage("extract")
+                        info = await speculative_tasks.result(f"ytinfo:{media_id}")
+                        format_spec = None
+                        if format_type == "mp4":
+                            downgrade = self._pick_downgrade(info, tier, media_id)
+                            if downgrade:
+                                format_spec, quality = downgrade
+                                quality_note = language_manager.get_text(user_id, 'status', 'auto_quality', quality=quality)
+
+                        def download():
+                            # Retries extract afresh in case the prefetched format URLs went stale
+                            nonlocal info
+                            prefetched, info = info, None
+                            return self._download_youtube(url, format_type=format_type, job=job, progress_msg=message,
+                                                          info=prefetched, tier=tier, format_spec=format_spec)
+
+                        job.enter_stage("download")
+                        result = await self._download_resilient("youtube", download)
+                    downloaded = result if source is None else None
+
+                    if result and result.exists():
+                        parts = [result]
+                        if format_type == "mp4":
+                            job.enter_stage("postprocess")
+                            await self._prepare_video(result)
+                            parts = await self._fit_upload_limit(result, message, user_id, job, cancel_markup)
+                            if not parts:
+                                idempotency_store.release(button_key)
+                                return await status_updater.edit(message, language_manager.get_text(user_id, 'status', 'file_too_large'))
+                        else:
+                            job.enter_stage("postprocess")
+                            extracting_text = language_manager.get_text(user_id, 'progress', 'extracting_audio', bitrate=bitrate)
+                            await status_updater.edit(message, extracting_text, reply_markup=cancel_markup)
+                            result = parts[0] = await self._extract_audio(result, bitrate, job.workspace)
+                        file_size = result.size
+                        formatted_size = language_manager.format_size(file_size, user_id)
+                        video_title = result.title
+                        if not video_title:
+                            job.enter_stage("extract")
+                            video_title = await self._extract_video_title(url, "YouTube")
+                        uploading_text = language_manager.get_text(user_id, 'progress', 'uploading', percentage=0)
+                        await status_updater.edit(message, uploading_text, reply_markup=cancel_markup)
+
+                        async def upload_progress(current, total):
+                            if job.cancelled:
+                                client.stop_transmission()
+                            job.report_progress()
+                            percentage = int((current / total) * 100)
+                            bar = language_manager.create_progress_bar(percentage)
+                            text = language_manager.get_text(user_id, 'progress', 'uploading', percentage=percentage)
+                            status_updater.update(message, f"📤 {text}: {bar}\n📁 {formatted_size}", reply_markup=cancel_markup)
+
+                        job.enter_stage("upload")
+                        if len(parts) > 1:
+                            await self._send_parts(client, message.chat.id, parts, video_title, message, user_id, job, cancel_markup)
+                        elif format_type == "mp4":
+                            caption = "\n\n".join(text for text in (video_title, quality_note) if text)
+                            sent = await uploader.send_video(client, message.chat.id, result, caption, upload_progress)
+                            # A downgraded file is not what this tier's cache key promises
+                            if not quality_note:
+                                await self._remember_video(result, sent.video.file_id if sent and sent.video else None,
+                                                           variant=variant)
+                        else:
+                            sent = await client.send_audio(
+                                chat_id=message.chat.id,
+                                audio=result.path,
+                                caption=video_title,
+                                progress=upload_progress,
+                                **result.audio_kwargs()
+                            )
+                            if sent and sent.audio and result.path.endswith(".mp3"):
+                                file_id_cache.put(cache_key, sent.audio.file_id, "audio", caption=video_title)
+                        job.check_cancelled()
+                        if downloaded:
+                            source_cache.put(downloaded)
+
+                        idempotency_store.release(button_key)
+                        await status_updater.edit(message, picker_text, reply_markup=picker_markup)
+
+                    else:
+                        idempotency_store.release(button_key)
+                        await status_updater.edit(message, f"❌ Yükləmə uğursuz oldu. Fayl tapılmadı.\n`file_path`: {result.path if result else None}")
+
+            except (asyncio.CancelledError, JobCancelled):
+                if not job or not job.cancelled:
+                    raise
+                idempotency_store.release(button_key)
+                await self._report_stopped(message, job, user_id)
+
+            except TranscodeQueueFull:
+                logger.warning(f"Transcode queue full, rejecting YouTube video for user {user_id}")
+                idempotency_store.release(button_key)
+                await status_updater.edit(message, language_manager.get_text(user_id, 'status', 'transcode_busy'))
+
+            except CircuitOpenError as e:
+                logger.warning(f"Fast-failing YouTube download for user {user_id}: {e}")
+                idempotency_store.release(button_key)
+                await status_updater.edit(message, language_manager.get_text(user_id, 'status', 'platform_down', platform="YouTube"))
 
             except Exception as e:
                 logger.error(f"YouTube yükləmə xətası: {e}", exc_info=True)
-                await message.edit_text(f"❌ Yükləmə uğursuz oldu:\n{str(e)}")
+                idempotency_store.release(button_key)
+                await status_updater.edit(message, f"❌ Yükləmə uğursuz oldu:\n{str(e)}")
+
+            finally:
+                status_updater.forget(message)
+                idempotency_store.complete(query_key)
+
+    async def _send_instagram_carousel(self, client: Client, chat_id: int, user, url: str, status_msg):
+        """
+        Send a multi-item Instagram post as one album.
+
+        Items are resolved in one metadata request, fetched and uploaded in
+        parallel, and cached per item so a repeat request needs no download.
+        Returns (sent, post): sent is False if the post is not a carousel or
+        its metadata can't be read, leaving it to the single-video path, which
+        can reuse the resolved single-video post instead of looking it up again.
+        """
+        shortcode = self._instagram_shortcode(url)
+        if not config.INSTAGRAM_CAROUSELS or not shortcode or "/p/" not in url:
+            return False, None
+        media_id = f"instagram:{shortcode}"
+        if await self._send_cached_carousel(client, chat_id, user.id, media_id):
+            status_updater.forget(status_msg)
+            await status_msg.delete()
+            return True, None
+
+        job_key = self._job_key(url, status_msg)
+        route = proxy_pool.acquire(job_key)
+        job = None
+        try:
+            async with job_manager.run(user.id, chat_id) as job:
+                # Not behind the circuit breaker: "not a carousel" is no platform failure
+                job.enter_stage("extract")
+                try:
+                    post = await self._run_cancellable(self._instagram_post_worker, shortcode, route)
+                except JobCancelled:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Instagram carousel lookup for {shortcode} failed, trying single video: {e}")
+                    return False, None
+                if not post or not post["carousel"]:
+                    return False, post
+
+                cancel_markup = self._cancel_markup(job, user.id)
+                downloading_text = language_manager.get_text(user.id, 'status', 'downloading', platform="Instagram")
+                await status_updater.edit(status_msg, downloading_text, reply_markup=cancel_markup)
+
+                job.enter_stage("download")
+                items = post["items"]
+                paths = await asyncio.gather(*(
+                    self._run_cancellable(
+                        self._fetch_media_worker, item["url"],
+                        os.path.join(job.workspace, f"{index:02d}{'.mp4' if item['is_video'] else '.jpg'}"), route
+                    )
+                    for index, item in enumerate(items)
+                ))
+                fetched = [(index, item, path) for index, (item, path) in enumerate(zip(items, paths)) if path]
+                if not fetched:
+                    await status_updater.edit(status_msg, language_manager.get_text(user.id, 'status', 'download_failed'))
+                    return True, None
+
+                job.enter_stage("postprocess")
+                results = {
+                    index: DownloadResult(path, title=post["title"], thumbnail_url=item["thumbnail"],
+                                          media_id=f"{media_id}:{index}", uploader=post["uploader"])
+                    for index, item, path in fetched if item["is_video"]
+                }
+                await asyncio.gather(*(self._prepare_video(result) for result in results.values()))
+
+                job.enter_stage("upload")
+                uploading_text = language_manager.get_text(user.id, 'progress', 'uploading', percentage=0)
+                await status_updater.edit(status_msg, uploading_text, reply_markup=cancel_markup)
+
+                async def upload_progress(current, total):
+                    job.report_progress()
+
+                file_ids = await asyncio.gather(*(
+                    uploader.upload_video(client, chat_id, results[index], upload_progress) if item["is_video"]
+                    else uploader.upload_photo(client, chat_id, path)
+                    for index, item, path in fetched
+                ))
+                job.check_cancelled()
+
+                total_size = sum(os.path.getsize(path) for _, _, path in fetched)
+                # A partial album must not be served from the cache forever
+                if len(fetched) == len(items):
+                    for position, ((_, item, _), file_id) in enumerate(zip(fetched, file_ids)):
+                        kind = "video" if item["is_video"] else "photo"
+                        file_id_cache.put(file_id_cache.key(media_id, f"item{position}"), file_id, kind)
+                    file_id_cache.put(file_id_cache.key(media_id, "carousel"), None, "carousel",
+                                      count=len(fetched), title=post["title"], size=total_size)
+
+                caption = self._build_caption(user.id, "Instagram", post["title"], language_manager.format_size(total_size, user.id))
+                media = [
+                    self._album_item("video" if item["is_video"] else "photo", file_id)
+                    for (_, item, _), file_id in zip(fetched, file_ids)
+                ]
+                await self._send_albums(client, chat_id, media, caption)
+
+            stats_manager.add_download("instagram")
+            status_updater.forget(status_msg)
+            await status_msg.delete()
+            await self._notify_admin_download(user, "Instagram", url, post["title"])
+            logger.info(f"Sent Instagram carousel {shortcode} ({len(fetched)} items) to user {user.id}")
+            return True, None
+
+        except (asyncio.CancelledError, JobCancelled):
+            if not job or not job.cancelled:
+                raise
+            await self._report_stopped(status_msg, job, user.id)
+            return True, None
+        finally:
+            proxy_pool.release(job_key)
+
+    async def _send_cached_carousel(self, client: Client, chat_id: int, user_id: int, media_id: str) -> bool:
+        """Send a carousel entirely from cached file IDs, if every item is cached."""
+        carousel_key = file_id_cache.key(media_id, "carousel")
+        entry = file_id_cache.get(carousel_key)
+        if not entry:
+            return False
+        items = [file_id_cache.get(file_id_cache.key(media_id, f"item{index}")) for index in range(entry["count"])]
+        if not all(items):
+            return False
+
+        caption = self._build_caption(user_id, "Instagram", entry.get("title"), language_manager.format_size(entry.get("size"), user_id))
+        media = [self._album_item(item["kind"], item["file_id"]) for item in items]
+        if await self._send_albums(client, chat_id, media, caption) < len(media):
+            file_id_cache.invalidate(carousel_key)
+            return False
+        return True
+
+    def _album_item(self, kind: str, file_id: str):
+        """Album entry for a cached photo or video."""
+        if kind == "photo":
+            return InputMediaPhoto(file_id)
+        return InputMediaVideo(file_id, supports_streaming=True)
+
+    async def _send_albums(self, client: Client, chat_id: int, media: list, caption: str = None) -> int:
+        """Send media as consecutive albums of up to 10, captioning the first item."""
+        if caption and media:
+            media[0].caption = caption
+        sent = 0
+        for start in range(0, len(media), 10):
+            sent += await self._send_album(client, chat_id, media[start:start + 10])
+        return sent
+
+    def _extract_urls(self, text: str) -> List[str]:
+        """Supported video URLs in a message, in order and without duplicates."""
+        urls = []
+        for url in URL_RE.findall(text or ""):
+            url = self._strip_url_punctuation(url)
+            if self._detect_platform(url) and url not in urls:
+                urls.append(url)
+        return urls
+
+    def _strip_url_punctuation(self, url: str) -> str:
+        """Drop sentence punctuation and unbalanced closing brackets glued to the end of a URL."""
+        pairs = {")": "(", "]": "[", "}": "{"}
+        while url:
+            last = url[-1]
+            if last in ".,;:!?":
+                url = url[:-1]
+            elif last in pairs and url.count(last) > url.count(pairs[last]):
+                url = url[:-1]
+            else:
+                break
+        return url
+
+    def _detect_platform(self, url: str) -> Optional[str]:
+        """Platform key of a URL, or None if it isn't supported."""
+        url = url.lower()
+        if "tiktok.com" in url:
+            return "tiktok"
+        if "instagram.com" in url:
+            return "instagram"
+        if "youtu.be" in url or "youtube.com" in url:
+            return "youtube"
+        return None
+
+    async def _download_for_platform(self, url: str, platform: str, job, progress_msg=None) -> Optional[DownloadResult]:
+        """Download a video URL with the platform's downloader (YouTube as MP4)."""
+        if platform == "tiktok":
+            return await self._download_tiktok(url, progress_msg, job)
+        if platform == "instagram":
+            return await self._download_instagram(url, progress_msg, job)
+        return await self._download_youtube(url, format_type="mp4", job=job, progress_msg=progress_msg)
+
+    async def _run_batch(self, client: Client, chat_id: int, user_id: int, urls: List[str], status_msg,
+                         concurrency: int = None) -> dict:
+        """
+        Download several URLs concurrently and send them in order as albums.
+
+        Every URL runs as its own job, so the user's fair-share limit in the
+        job manager still applies; concurrency caps how many of this batch's
+        jobs may be queued at once. One status message shows combined
+        progress and the final summary.
+        """
+        total = len(urls)
+        results: List[Optional[list]] = [None] * total
+        counts = {"done": 0, "failed": 0, "sent": 0}
+        batch_slots = asyncio.Semaphore(concurrency or total)
+        send_lock = asyncio.Lock()
+        next_index = 0
+        pending_media: list = []
+
+        async def flush(final: bool = False):
+            nonlocal next_index, pending_media
+            async with send_lock:
+                # Albums keep the order of the URLs
+                while next_index < total and results[next_index] is not None:
+                    pending_media.extend(results[next_index])
+                    results[next_index] = []
+                    next_index += 1
+                while len(pending_media) >= 10 or (final and pending_media):
+                    album, pending_media = pending_media[:10], pending_media[10:]
+                    counts["sent"] += await self._send_album(client, chat_id, album)
+
+        async def run(index: int, url: str):
+            async with batch_slots:
+                try:
+                    items, _ = await self._run_item(client, chat_id, user_id, url)
+                except Exception as e:
+                    logger.warning(f"Batch item {url} failed: {e}")
+                    items = None
+                items = items or []
+            results[index] = items
+            counts["done"] += 1
+            if not items:
+                counts["failed"] += 1
+            progress_text = language_manager.get_text(
+                user_id, 'status', 'batch_progress', done=counts["done"], total=total, failed=counts["failed"]
+            )
+            status_updater.update(status_msg, f"{progress_text}\n{language_manager.create_progress_bar(counts['done'] * 100 // total)}")
+            await flush()
+
+        logger.info(f"Batch of {total} URLs started for user {user_id}")
+        await asyncio.gather(*(run(index, url) for index, url in enumerate(urls)))
+        await flush(final=True)
+
+        summary = language_manager.get_text(
+            user_id, 'status', 'batch_done', sent=counts["sent"], total=total, failed=counts["failed"]
+        )
+        await status_updater.edit(status_msg, summary)
+        logger.info(f"Batch for user {user_id} finished: {counts}")
+        return counts
+
+    async def _run_item(self, client: Client, chat_id: int, user_id: int, url: str) -> tuple:
+        """
+        Run _batch_item in its own task and return (items, job).
+
+        The item's job is bound to that task, so when the watchdog or the user
+        stops it only the item fails: items is None and job tells why.
+        Cancellation of the caller itself still propagates.
+        """
+        jobs = []
+        task = asyncio.create_task(self._batch_item(client, chat_id, user_id, url, jobs))
+        try:
+            return await task, None
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling() or not task.cancelled():
+                raise
+            job = jobs[0] if jobs else None
+            logger.warning(f"Item {url} stopped in stage '{job.stage if job else None}'")
+            return None, job
+
+    async def _batch_item(self, client: Client, chat_id: int, user_id: int, url: str, jobs: list = None) -> list:
+        """Download and upload one URL of a batch, returning album items for it."""
+        platform = self._detect_platform(url)
+        async with job_manager.run(user_id, chat_id) as job:
+            if jobs is not None:
+                jobs.append(job)
+            job.enter_stage("download")
+            result = await self._download_resilient(platform, lambda: self._download_for_platform(url, platform, job))
+            if not result or not result.exists():
+                return []
+
+            fingerprint = await content_fingerprint(result.path)
+            cached_key = await self._match_content(fingerprint)
+            if cached_key:
+                entry = file_id_cache.get(cached_key)
+                stats_manager.add_download(platform)
+                return [InputMediaVideo(entry["file_id"], caption=result.title or "", supports_streaming=True)]
+
+            job.enter_stage("postprocess")
+            await self._prepare_video(result)
+            parts = await self._fit_upload_limit(result, None, user_id, job)
+
+            async def upload_progress(current, total):
+                job.report_progress()
+
+            job.enter_stage("upload")
+            items = []
+            for part in parts:
+                file_id = await uploader.upload_video(client, chat_id, part, upload_progress)
+                kwargs = part.video_kwargs()
+                kwargs.pop("thumb", None)
+                items.append(InputMediaVideo(file_id, caption=part.title or "", **kwargs))
+            if len(parts) == 1:
+                await self._remember_video(result, items[0].media, fingerprint)
+            if items:
+                stats_manager.add_download(platform)
+            return items
+
+    async def _send_album(self, client: Client, chat_id: int, media: list) -> int:
+        """Send up to 10 items as one album, falling back to one by one. Returns how many were sent."""
+        if len(media) > 1:
+            try:
+                await client.send_media_group(chat_id, media)
+                return len(media)
+            except Exception as e:
+                logger.warning(f"Album of {len(media)} failed, sending items separately: {e}")
+
+        sent = 0
+        for item in media:
+            try:
+                if isinstance(item, InputMediaPhoto):
+                    await client.send_photo(chat_id, item.media, caption=item.caption)
+                else:
+                    await client.send_video(chat_id, item.media, caption=item.caption, supports_streaming=True)
+                sent += 1
+            except Exception as e:
+                logger.warning(f"Could not send batch item: {e}")
+        return sent
+
+    def _build_caption(self, user_id: int, platform: str, video_title: str, formatted_size: str) -> str:
+        """Caption for a downloaded video in the user's language."""
+        platform_text = platform.title()
+        promo_text = self._get_promotional_text(user_id)
+        user_lang = language_manager.get_user_language(user_id)
+
+        if user_lang == 'az':
+            caption = f"📹 {platform_text}dan yükləndi"
+            if video_title:
+                caption += f"\n🎬 {video_title}"
+            caption += f"\n📁 Ölçü: {formatted_size}\n\n{promo_text}"
+        elif user_lang == 'en':
+            caption = f"📹 Downloaded from {platform_text}"
+            if video_title:
+                caption += f"\n🎬 {video_title}"
+            caption += f"\n📁 Size: {formatted_size}\n\n{promo_text}"
+        elif user_lang == 'tr':
+            caption = f"📹 {platform_text}'dan indirildi"
+            if video_title:
+                caption += f"\n🎬 {video_title}"
+            caption += f"\n📁 Boyut: {formatted_size}\n\n{promo_text}"
+        elif user_lang == 'ru':
+            caption = f"📹 Загружено с {platform_text}"
+            if video_title:
+                caption += f"\n🎬 {video_title}"
+            caption += f"\n📁 Размер: {formatted_size}\n\n{promo_text}"
+        else:
+            caption = f"📹 Downloaded from {platform_text}"
+            if video_title:
+                caption += f"\n🎬 {video_title}"
+            caption += f"\n📁 Size: {formatted_size}\n\n{promo_text}"
+        return caption
+
+    async def _match_content(self, fingerprint) -> Optional[str]:
+        """File ID cache key of an earlier upload with exactly the same bytes."""
+        cached_key = file_id_cache.find_content(fingerprint.quick)
+        if not cached_key:
+            return None
+        entry = file_id_cache.entries.get(cached_key) or {}
+        # The quick fingerprint only samples the file; confirm with the full hash
+        if entry.get("sha256") != await fingerprint.full():
+            return None
+        logger.info(f"Content match with cached upload {cached_key}")
+        return cached_key
+
+    async def _remember_video(self, result: DownloadResult, file_id: Optional[str], fingerprint=None,
+                              variant: str = "video"):
+        """Store a sent video's file ID under its media ID (and variant) and content fingerprint."""
+        if not file_id:
+            return
+        extra = {"title": result.title, "size": result.size if result.exists() else None}
+        if fingerprint is not None:
+            extra["content"] = fingerprint.quick
+            extra["sha256"] = await fingerprint.full()
+        media_id = result.media_id or (f"sha256:{extra['sha256']}" if "sha256" in extra else None)
+        if not media_id:
+            return
+        file_id_cache.put(file_id_cache.key(media_id, variant), file_id, "video", **extra)
+
+    async def _extract_audio(self, result: DownloadResult, bitrate: int, output_dir: str = None) -> DownloadResult:
+        """
+        Convert a download into a tagged MP3 with cover art.
+
+        Falls back to the original audio file if ffmpeg is missing or fails.
+        """
+        if not audio_extractor.available:
+            return result
+        cover = await thumbnail_cache.get(result)
+        audio = await audio_extractor.extract_mp3(result, bitrate, cover, output_dir)
+        if audio is None:
+            logger.warning(f"MP3 extraction failed for {result.path}, sending the original audio")
+            return result
+        return audio
+
+    async def _send_cached(self, client: Client, chat_id: int, cache_key: str, caption: str = None) -> bool:
+        """Re-send a previously uploaded file by its cached file ID."""
+        entry = file_id_cache.get(cache_key)
+        if not entry:
+            return False
+        caption = caption if caption is not None else entry.get("caption") or entry.get("title")
+        try:
+            if entry["kind"] == "audio":
+                await client.send_audio(chat_id, entry["file_id"], caption=caption)
+            else:
+                await client.send_video(chat_id, entry["file_id"], caption=caption, supports_streaming=True)
+        except Exception as e:
+            logger.warning(f"Cached file ID for {cache_key} was rejected: {e}")
+            file_id_cache.invalidate(cache_key)
+            return False
+        return True
+
+    async def _prepare_video(self, result: DownloadResult) -> DownloadResult:
+        """Faststart-remux the video and attach a cached thumbnail, in parallel."""
+        _, result.thumbnail_path = await asyncio.gather(
+            prepare_for_streaming(result),
+            thumbnail_cache.get(result),
+        )
+        return result
+
+    async def _fit_upload_limit(self, result: DownloadResult, status_msg, user_id: int, job, markup=None) -> List[DownloadResult]:
+        """
+        Make sure a video fits the upload limit.
+
+        Oversized videos are transcoded on the CPU or split into parts,
+        depending on OVERSIZE_STRATEGY. Returns the files to send, or an
+        empty list if the video could not be made to fit.
+        """
+        limit = config.UPLOAD_SIZE_LIMIT_MB * 1024 * 1024
+        if result.size <= limit:
+            return [result]
+        if not result.duration:
+            logger.warning(f"{result.path} exceeds the upload limit and has no known duration")
+            return []
+
+        if config.OVERSIZE_STRATEGY == "split" or not transcoder.available:
+            return await self._split_result(result, limit)
+
+        async def transcode_progress(percentage):
+            if status_msg is None:
+                return
+            text = language_manager.get_text(user_id, 'progress', 'transcoding', percentage=percentage)
+            status_updater.update(status_msg, f"{text}\n{language_manager.create_progress_bar(percentage)}", reply_markup=markup)
+
+        await transcode_progress(0)
+        # Queue time has no deadline; the transcode deadline starts with the encode
+        job.enter_stage("queued")
+        async with job_manager.released_slot(job):
+            path = await transcoder.transcode(result.path, result.duration, limit, transcode_progress,
+                                              on_start=lambda: job.enter_stage("transcode"))
+            job.enter_stage("queued")
+        if not path:
+            return []
+        logger.info(f"Transcoded {os.path.basename(result.path)} from {result.size} to {os.path.getsize(path)} bytes")
+        result.path = path
+        return [result]
+
+    async def _split_result(self, result: DownloadResult, limit: int) -> List[DownloadResult]:
+        """Split an oversized video into keyframe-aligned parts with their own metadata."""
+        paths = await split_video(result.path, result.duration, limit)
+        parts = []
+        for index, path in enumerate(paths, start=1):
+            probed = await probe_video(path)
+            part = DownloadResult(
+                path=path,
+                title=f"{result.title} ({index}/{len(paths)})" if result.title else None,
+                duration=probed.get("duration"),
+                width=probed.get("width") or result.width,
+                height=probed.get("height") or result.height,
+            )
+            part.thumbnail_path = result.thumbnail_path
+            parts.append(part)
+        return parts
+
+    async def _send_parts(self, client: Client, chat_id: int, parts: List[DownloadResult], caption: str,
+                          status_msg, user_id: int, job, markup=None):
+        """Upload video parts concurrently, then send them in order as albums."""
+        total = sum(part.size for part in parts) or 1
+        uploaded = [0] * len(parts)
+        formatted_size = language_manager.format_size(total, user_id)
+
+        def part_progress(index: int):
+            async def progress(current, _):
+                job.report_progress()
+                uploaded[index] = current
+                percentage = int(sum(uploaded) * 100 / total)
+                bar = language_manager.create_progress_bar(percentage)
+                text = language_manager.get_text(user_id, 'progress', 'uploading', percentage=percentage)
+                status_updater.update(status_msg, f"📤 {text}: {bar}\n📁 {formatted_size}", reply_markup=markup)
+            return progress
+
+        # Cancelling the job cancels this task, which cancels every part upload
+        file_ids = await asyncio.gather(*(
+            uploader.upload_video(client, chat_id, part, part_progress(index))
+            for index, part in enumerate(parts)
+        ))
+        job.check_cancelled()
+
+        count = len(parts)
+        media = []
+        for index, (part, file_id) in enumerate(zip(parts, file_ids), start=1):
+            part_caption = f"🎞 {index}/{count}"
+            if index == 1 and caption:
+                part_caption = f"{caption}\n\n{part_caption}"
+            kwargs = part.video_kwargs()
+            kwargs.pop("thumb", None)
+            media.append(InputMediaVideo(file_id, caption=part_caption, **kwargs))
+
+        for start in range(0, count, 10):
+            await client.send_media_group(chat_id, media[start:start + 10])
+        logger.info(f"Sent {count} parts to chat {chat_id}")
+
+    def _cancel_markup(self, job, user_id: int) -> InlineKeyboardMarkup:
+        """Inline keyboard with a Cancel button for a running job."""
+        cancel_text = language_manager.get_text(user_id, 'status', 'cancel_button')
+        return InlineKeyboardMarkup([[InlineKeyboardButton(cancel_text, callback_data=f"cancel|{job.id}")]])
+
+    async def _report_stopped(self, status_msg, job, user_id: int):
+        """Tell the user a job was cancelled or stopped by the watchdog."""
+        key = 'stage_timeout' if job.timed_out_stage else 'cancelled'
+        logger.info(f"Job {job.id} stopped ({key}, stage '{job.stage}')")
+        if not await status_updater.edit(status_msg, language_manager.get_text(user_id, 'status', key)):
+            logger.warning(f"Failed to report stopped job {job.id}")
     
-    async def _download_tiktok(self, url: str, progress_msg=None) -> Optional[str]:
-        """Download TikTok video using yt-dlp with optimized settings."""
+    async def _download_tiktok(self, url: str, progress_msg=None, job=None) -> Optional[DownloadResult]:
+        """Download TikTok video, hedging across header profiles ordered by success rate."""
         logger.info(f"Starting TikTok download for: {url}")
+
+        profiles = tiktok_profiles.ordered()[:max(1, config.TIKTOK_HEDGE_ATTEMPTS)]
+        delay = tiktok_latency.percentile(config.TIKTOK_HEDGE_PERCENTILE, config.TIKTOK_HEDGE_DELAY)
+        job_key = self._job_key(url, progress_msg)
+        route = proxy_pool.acquire(job_key)
+        workspace = job.workspace if job else None
+        status_hook = self._download_progress_hook(progress_msg, job)
+        # Once any profile is receiving bytes, stop launching new ones
+        resolved = threading.Event()
+
+        def progress_hook(d):
+            if d.get('status') == 'downloading':
+                resolved.set()
+            if status_hook:
+                status_hook(d)
+
+        attempts = [
+            (lambda name=name: self._tiktok_attempt(url, name, route, workspace, progress_hook))
+            for name in profiles
+        ]
         try:
-            import yt_dlp
-            import random
-            
-            # Create unique temporary filename
-            import os
-            import time
-            temp_dir = tempfile.gettempdir()
-            temp_filename = f"tiktok_{int(time.time())}_{os.getpid()}"
-            temp_path = os.path.join(temp_dir, temp_filename)
-            
-            # Random user agents for TikTok
-            user_agents = [
-                'Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
-                'Mozilla/5.0 (Linux; Android 12; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            ]
-            
-            # TikTok optimized configuration
-            ydl_opts = {
-                'format': 'best[ext=mp4]/mp4/best',
-                'outtmpl': f'{temp_path}.%(ext)s',
-                'quiet': True,
-                'no_warnings': True,
-                'user_agent': random.choice(user_agents),
-                'http_headers': {
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'DNT': '1',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                },
-                'extractor_args': {
-                    'tiktok': {
-                        'webpage_url_basename': 'video'
-                    }
+            return await hedged_race(attempts, delay=delay, name="TikTok download", progressed=resolved)
+        finally:
+            proxy_pool.release(job_key)
+
+    async def _tiktok_attempt(self, url: str, profile_name: str, route=None, workspace: str = None,
+                              progress_hook=None) -> Optional[DownloadResult]:
+        """Run one TikTok download attempt and record its profile score and latency."""
+        started = time.monotonic()
+        try:
+            result = await self._run_cancellable(self._tiktok_worker, url, profile_name, route, workspace, progress_hook)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            tiktok_profiles.record(profile_name, False)
+            raise
+
+        tiktok_profiles.record(profile_name, bool(result))
+        if result:
+            tiktok_latency.add(time.monotonic() - started)
+        return result
+
+    def _tiktok_worker(self, cancel_event: threading.Event, url: str, profile_name: str,
+                       route=None, workspace: str = None, progress_hook=None) -> Optional[DownloadResult]:
+        """Download TikTok video with one header profile (runs in executor)."""
+        temp_dir = tempfile.mkdtemp(prefix="tiktok_", dir=workspace)
+        profile = TIKTOK_HEADER_PROFILES[profile_name]
+
+        def cancel_hook(_):
+            if cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled()
+
+        # TikTok optimized configuration
+        ydl_opts = {
+            'format': 'best[ext=mp4]/mp4/best',
+            'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s'),
+            'quiet': True,
+            'no_warnings': True,
+            'user_agent': profile['user_agent'],
+            'http_headers': profile['headers'],
+            'progress_hooks': [cancel_hook] + ([progress_hook] if progress_hook else []),
+            'extractor_args': {
+                'tiktok': {
+                    'webpage_url_basename': 'video'
                 }
             }
-            
+        }
+        ydl_opts.update(self._proxy_opts(route))
+
+        started = time.monotonic()
+        try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-                
-            # Find the actual downloaded file
-            import glob
-            pattern = f'{temp_path}.*'
-            files = glob.glob(pattern)
-            
-            if files and os.path.exists(files[0]) and os.path.getsize(files[0]) > 0:
-                downloaded_file = files[0]
-                logger.info(f"TikTok video saved to: {downloaded_file} (size: {os.path.getsize(downloaded_file)} bytes)")
-                return downloaded_file
-            else:
-                logger.error(f"TikTok download failed or file is empty. Found files: {files}")
-                return None
-                
+                info = ydl.extract_info(url, download=True)
+        except yt_dlp.utils.DownloadCancelled:
+            logger.info(f"TikTok attempt with profile '{profile_name}' cancelled")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return None
         except Exception as e:
-            logger.error(f"TikTok download error: {e}", exc_info=True)
+            proxy_pool.report(route, error=e)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        proxy_pool.report(route, latency=time.monotonic() - started)
+
+        if cancel_event.is_set():
+            shutil.rmtree(temp_dir, ignore_errors=True)
             return None
-    
-    async def _download_youtube(self, url: str, format_type: str = "mp4") -> str | None:
+
+        # Find the actual downloaded file
+        files = [f for f in glob.glob(os.path.join(temp_dir, '*')) if not f.endswith('.part')]
+
+        if files and os.path.getsize(files[0]) > 0:
+            downloaded_file = files[0]
+            logger.info(f"TikTok video saved with profile '{profile_name}' to: {downloaded_file} (size: {os.path.getsize(downloaded_file)} bytes)")
+            return DownloadResult.from_info(downloaded_file, info)
+
+        logger.error(f"TikTok download with profile '{profile_name}' failed or file is empty. Found files: {files}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return None
+
+    async def _youtube_info(self, video_id: str) -> Optional[dict]:
+        """
+        Metadata for the format keyboard, waiting at most YOUTUBE_INFO_WAIT seconds.
+
+        Extraction keeps running after a timeout, so the download can still use it.
+        """
+        self._speculate_youtube_info(video_id)
+        try:
+            return await asyncio.wait_for(speculative_tasks.result(f"ytinfo:youtube:{video_id}", peek=True),
+                                          config.YOUTUBE_INFO_WAIT)
+        except asyncio.TimeoutError:
+            logger.info(f"YouTube metadata for {video_id} not ready, showing the keyboard without sizes")
+            return None
+
+    def _youtube_keyboard(self, user_id: int, video_id: str, info: Optional[dict]) -> InlineKeyboardMarkup:
+        """Quality tiers and MP3 bitrates, labelled with estimated sizes when known."""
+        estimates = self._youtube_size_estimates(info)
+        heights = [f.get("height") for f in (info or {}).get("formats") or [] if f.get("height")]
+        max_height = max(heights, default=None)
+
+        def label(text: str, key: str) -> str:
+            size = estimates.get(key)
+            return f"{text} · ~{language_manager.format_size(size, user_id)}" if size else text
+
+        video_buttons = []
+        for tier, (height, _) in YOUTUBE_TIERS.items():
+            # A cap at or above the source resolution is the same file as "best"
+            if height and max_height and height >= max_height:
+                continue
+            name = f"{height}p" if height else (f"{max_height}p" if max_height else "Video")
+            video_buttons.append(InlineKeyboardButton(label(f"📹 {name}", tier), callback_data=callback_data.pack("yt_video", video_id, tier)))
+
+        audio_buttons = [
+            InlineKeyboardButton(label(f"🎵 MP3 {bitrate}k", f"mp3:{bitrate}"), callback_data=callback_data.pack("yt_audio", video_id, bitrate))
+            for bitrate in config.AUDIO_BITRATES
+        ]
+        return InlineKeyboardMarkup([video_buttons, audio_buttons])
+
+    def _youtube_size_estimates(self, info: Optional[dict]) -> dict:
+        """Estimated bytes per tier and MP3 bitrate from unprocessed yt-dlp metadata."""
+        formats = (info or {}).get("formats") or []
+        duration = (info or {}).get("duration") or 0
+
+        size = lambda f: self._format_size(f, duration)
+        has = self._has_codec
+
+        audio_size = max((size(f) or 0 for f in formats if has(f, "acodec") and not has(f, "vcodec")), default=0)
+        estimates = {}
+        for tier, (height, _) in YOUTUBE_TIERS.items():
+            videos = [f for f in formats if has(f, "vcodec") and f.get("height") and size(f)
+                      and (height is None or f["height"] <= height)]
+            if videos:
+                chosen = max(videos, key=lambda f: (f["height"], size(f)))
+                estimates[tier] = size(chosen) + (0 if has(chosen, "acodec") else audio_size)
+        if duration:
+            for bitrate in config.AUDIO_BITRATES:
+                estimates[f"mp3:{bitrate}"] = bitrate * 125 * duration
+        return estimates
+
+    def _format_size(self, f: dict, duration: float) -> Optional[float]:
+        """Reported or bitrate-derived size of one yt-dlp format."""
+        if f.get("filesize") or f.get("filesize_approx"):
+            return f.get("filesize") or f.get("filesize_approx")
+        return f["tbr"] * 125 * duration if f.get("tbr") and duration else None
+
+    def _has_codec(self, f: dict, codec: str) -> bool:
+        """Whether a yt-dlp format has a video ("vcodec") or audio ("acodec") stream."""
+        return f.get(codec) not in (None, "none")
+
+    def _pick_downgrade(self, info: Optional[dict], tier: str, media_id: str = None) -> Optional[tuple]:
+        """
+        Lower pre-muxed format to use when the default quality would upload too slowly.
+
+        Uses the rolling upload throughput to predict the upload time of the
+        "best" tier; above UPLOAD_TARGET_SECONDS the highest pre-muxed format
+        that fits the target (or the smallest one) is chosen, which also skips
+        the merge. Returns (yt-dlp format, quality label) or None.
+        """
+        target = config.UPLOAD_TARGET_SECONDS
+        rate = uploader.throughput.rate()
+        if tier != "best" or target <= 0 or not rate or not info:
+            return None
+        best = self._youtube_size_estimates(info).get("best")
+        if not best or best / rate <= target:
+            return None
+
+        duration = info.get("duration") or 0
+        muxed = [f for f in info.get("formats") or []
+                 if self._has_codec(f, "vcodec") and self._has_codec(f, "acodec")
+                 and f.get("height") and self._format_size(f, duration)
+                 and self._format_size(f, duration) < best]
+        if not muxed:
+            return None
+        fitting = [f for f in muxed if self._format_size(f, duration) / rate <= target]
+        chosen = max(fitting, key=lambda f: f["height"]) if fitting else min(muxed, key=lambda f: self._format_size(f, duration))
+
+        quality = f"{chosen['height']}p"
+        logger.info(
+            f"Downgrading {media_id} to {quality} (format {chosen['format_id']}): upload rate "
+            f"{rate / 1024 / 1024:.2f} MB/s predicts {best / rate:.0f}s for best quality, target {target}s"
+        )
+        return chosen["format_id"], quality
+
+    def _speculate_youtube_info(self, video_id: str):
+        """Start extracting a YouTube video's metadata before the user picks a format."""
+        url = MEDIA_URLS["youtube"].format(video_id)
+        media_id = f"youtube:{video_id}"
+        job_key = self._job_key(url)
+
+        async def extract():
+            # Format URLs are tied to the IP that extracted them; the route stays
+            # sticky for this URL, so the download later goes out the same way
+            route = proxy_pool.acquire(job_key)
+            return await self._run_cancellable(self._youtube_info_worker, url, route)
+
+        # The download releases the route; unused results must free it themselves
+        speculative_tasks.start(f"ytinfo:{media_id}", extract, on_unused=lambda: proxy_pool.release(job_key))
+
+    def _youtube_info_worker(self, cancel_event: threading.Event, url: str, route=None) -> Optional[dict]:
+        """Extract unprocessed YouTube metadata, including all formats (runs in executor)."""
+        if cancel_event.is_set():
+            return None
+        account = cookie_manager.acquire("youtube")
+        ydl_opts = {"quiet": True, "no_warnings": True, "skip_download": True}
+        ydl_opts.update(self._proxy_opts(route))
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            cookie_manager.apply_to_ydl(ydl, account)
+            started = time.monotonic()
+            try:
+                info = ydl.extract_info(url, download=False, process=False)
+            except Exception as e:
+                cookie_manager.report_failure(account, e)
+                proxy_pool.report(route, error=e)
+                raise
+            cookie_manager.report_success(account)
+            proxy_pool.report(route, latency=time.monotonic() - started)
+        return None if cancel_event.is_set() else info
+
+    async def _download_youtube(self, url: str, format_type: str = "mp4", job=None, progress_msg=None,
+                                info: dict = None, tier: str = "best", format_spec: str = None) -> Optional[DownloadResult]:
+        """Download a YouTube video (at a quality tier) or its audio, reusing prefetched metadata when given."""
         try:
-            temp_dir = tempfile.mkdtemp()
-            plugin_dir = os.path.dirname(__file__)  # bot/plugins yolunu verir
-            cookie_path = os.path.join(plugin_dir, "cookieyt.txt")
+            temp_dir = tempfile.mkdtemp(dir=job.workspace if job else None)
+            account = cookie_manager.acquire("youtube")
+            job_key = self._job_key(url)
+            route = proxy_pool.acquire(job_key)
 
             ydl_opts = {
                 "outtmpl": os.path.join(temp_dir, "%(title)s.%(ext)s"),
-                "format": "bestaudio/best" if format_type == "mp3" else "bestvideo+bestaudio/best",
-                "merge_output_format": format_type,
+                "format": "bestaudio/best" if format_type == "mp3" else "/".join(filter(None, (format_spec, YOUTUBE_TIERS[tier][1]))),
                 "quiet": True,
             }
+            if format_type == "mp4":
+                ydl_opts["merge_output_format"] = "mp4"
+            ydl_opts.update(self._proxy_opts(route))
+
+            loop = asyncio.get_running_loop()
 
-            if os.path.exists(cookie_path):
-                ydl_opts["cookiefile"] = cookie_path
+            def postprocessor_hook(d):
+                # Merging/converting runs under its own watchdog deadline
+                if job and d.get("status") == "started" and job.stage != "postprocess":
+                    loop.call_soon_threadsafe(job.enter_stage, "postprocess")
+
+            ydl_opts["postprocessor_hooks"] = [postprocessor_hook]
+            progress_hook = self._download_progress_hook(progress_msg, job)
 
             file_path = None
+            prefetched = info
+            info = None
+
+            def run_ydl(cancel_event):
+                nonlocal file_path, info
 
-            def run_ydl():
-                nonlocal file_path
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=True)
+                def cancel_hook(_):
+                    if cancel_event.is_set():
+                        raise yt_dlp.utils.DownloadCancelled()
+
+                hooks = [cancel_hook] + ([progress_hook] if progress_hook else [])
+                with yt_dlp.YoutubeDL({**ydl_opts, "progress_hooks": hooks}) as ydl:
+                    cookie_manager.apply_to_ydl(ydl, account)
+                    started = time.monotonic()
+                    try:
+                        if prefetched:
+                            # Format selection and download only; processing mutates the dict
+                            info = ydl.process_ie_result(copy.deepcopy(prefetched), download=True)
+                        else:
+                            info = ydl.extract_info(url, download=True)
+                    except Exception as e:
+                        cookie_manager.report_failure(account, e)
+                        proxy_pool.report(route, error=e)
+                        raise
+                    cookie_manager.report_success(account)
+                    proxy_pool.report(route, latency=time.monotonic() - started)
                     # requested_downloads varsa onu götür, yoxdursa standart filename
                     if "requested_downloads" in info and info["requested_downloads"]:
                         file_path = info["requested_downloads"][0]["filepath"]
                     else:
                         file_path = ydl.prepare_filename(info)
 
-            await asyncio.get_event_loop().run_in_executor(None, run_ydl)
+            try:
+                await self._run_cancellable(run_ydl)
+            finally:
+                proxy_pool.release(job_key)
 
             if file_path and os.path.exists(file_path):
-                return file_path
+                return DownloadResult.from_info(file_path, info)
             return None
 
         except Exception as e:
-            print(f"❌ YouTube yükləmə xətası: {e}")
-            return None
-            
-            
-    
-    async def _download_instagram(self, url: str, progress_msg=None) -> Optional[str]:
-        import os
-        import time
-        import tempfile
-        import glob
-        import yt_dlp
-        import logging
+            logger.error(f"❌ YouTube yükləmə xətası: {e}")
+            raise
 
-        logger = logging.getLogger(__name__)
+    async def _download_instagram(self, url: str, progress_msg=None, job=None,
+                                  post: dict = None) -> Optional[DownloadResult]:
+        """
+        Download Instagram media, hedging yt-dlp with instaloader when it stalls.
 
+        A post already resolved by the carousel lookup is fetched directly
+        from its video URL; the extractors are only used if that fails.
+        """
         logger.info(f"Starting Instagram download for: {url}")
 
+        job_key = self._job_key(url, progress_msg)
+        route = proxy_pool.acquire(job_key)
+        workspace = job.workspace if job else None
+        status_hook = self._download_progress_hook(progress_msg, job)
+        # Hedge only while yt-dlp has not resolved a media URL, not while it downloads one
+        resolved = threading.Event()
+
+        def progress_hook(d):
+            if d.get('status') == 'downloading':
+                resolved.set()
+            if status_hook:
+                status_hook(d)
+
+        attempts = [lambda: self._run_cancellable(self._instagram_ytdlp_worker, url, route, workspace, progress_hook)]
+        if config.INSTAGRAM_HEDGING and self._instagram_shortcode(url):
+            attempts.append(lambda: self._run_cancellable(self._instagram_instaloader_worker, url, route, workspace))
+
         try:
-            temp_dir = tempfile.gettempdir()
-            temp_filename = f"instagram_{int(time.time())}_{os.getpid()}"
-            temp_path = os.path.join(temp_dir, temp_filename)
+            if post:
+                result = await self._run_cancellable(self._instagram_direct_worker, post, route, workspace)
+                if result:
+                    return result
+            return await hedged_race(attempts, delay=config.INSTAGRAM_HEDGE_DELAY, name="Instagram download",
+                                     progressed=resolved)
+        finally:
+            proxy_pool.release(job_key)
 
-        # cookies.txt faylının yolu – bu fayl kodla eyni qovluqda olmalıdır
-            cookies_path = os.path.join(os.path.dirname(__file__), "cookies.txt")
+    def _download_progress_hook(self, progress_msg, job):
+        """
+        Build a yt-dlp progress hook that shows bytes, speed and ETA on the status message.
 
-        # Fayl varsa davam et
-            if not os.path.exists(cookies_path):
-                logger.error("cookies.txt tapılmadı!")
-                return None
+        The hook runs in the executor thread and hands updates to the event
+        loop, where the status updater throttles them. Without a status
+        message it only keeps the job's stall deadline moving.
+        """
+        if job is None:
+            return None
+        loop = asyncio.get_running_loop()
+        markup = self._cancel_markup(job, job.user_id)
 
-            ydl_opts = {
-                'format': 'best[ext=mp4]/best',
-                'outtmpl': f'{temp_path}.%(ext)s',
-                'quiet': True,
-                'no_warnings': True,
-                'cookies': cookies_path,
-            }
+        def hook(d):
+            status = d.get('status')
+            downloaded = d.get('downloaded_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if status == 'finished':
+                elapsed = d.get('elapsed')
+                if elapsed:
+                    logger.info(f"Job {job.id} downloaded {total or downloaded} bytes in {elapsed:.1f}s "
+                                f"({(total or downloaded) / elapsed / 1024:.0f} KB/s)")
+                return
+            if status != 'downloading':
+                return
+            job.report_progress()
+            if progress_msg is None:
+                return
+
+            percentage = min(100, int(downloaded * 100 / total)) if total else 0
+            size = language_manager.format_size(downloaded, job.user_id)
+            if total:
+                size = f"{size} / {language_manager.format_size(total, job.user_id)}"
+            text = language_manager.get_text(job.user_id, 'progress', 'downloading', percentage=percentage, size=size)
+            details = []
+            if d.get('speed'):
+                details.append(f"⚡ {language_manager.format_size(d['speed'], job.user_id)}/s")
+            if d.get('eta') is not None:
+                eta = int(d['eta'])
+                details.append(f"⏱ {eta // 60}:{eta % 60:02d}")
+            if details:
+                text += "\n" + "  ".join(details)
+            loop.call_soon_threadsafe(status_updater.update, progress_msg, text, markup)
 
-        # Videonu yüklə
+        return hook
+
+    def _canonical_media_id(self, url: str) -> Optional[str]:
+        """Media ID of a URL as the downloaders report it, if it can be told from the URL alone."""
+        platform = self._detect_platform(url)
+        if platform == "youtube":
+            return self._youtube_media_id(url)
+        match = (INSTAGRAM_SHORTCODE_RE if platform == "instagram" else TIKTOK_ID_RE).search(url) if platform else None
+        return f"{platform}:{match.group(1)}" if match else None
+
+    def _youtube_media_id(self, url: str) -> Optional[str]:
+        """Canonical media ID of a YouTube URL, matching DownloadResult.media_id."""
+        match = YOUTUBE_ID_RE.search(url)
+        return f"youtube:{match.group(1)}" if match else None
+
+    def _job_key(self, url: str, progress_msg=None) -> str:
+        """Key identifying one download job, used for sticky proxy selection."""
+        if progress_msg is not None:
+            return f"{progress_msg.chat.id}:{progress_msg.id}"
+        return url
+
+    def _proxy_opts(self, route) -> dict:
+        """yt-dlp options routing a request through a proxy pool route."""
+        if route is None or not route.url:
+            return {}
+        return {'proxy': route.url}
+
+    async def _download_resilient(self, platform: str, download):
+        """Run a download with transient-error retries behind the platform's circuit breaker."""
+        breaker = circuit_breakers[platform]
+        return await breaker.call(lambda: retry_async(download, name=f"{platform} download"))
+
+    async def _run_cancellable(self, worker, *args):
+        """Run a blocking worker in the download executor and signal it to stop if the task is cancelled."""
+        cancel_event = threading.Event()
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, worker, cancel_event, *args)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            raise
+
+    def _instagram_ytdlp_worker(self, cancel_event: threading.Event, url: str,
+                                route=None, workspace: str = None, progress_hook=None) -> Optional[DownloadResult]:
+        """Download an Instagram video with yt-dlp (runs in executor)."""
+        temp_dir = tempfile.mkdtemp(prefix="instagram_ytdlp_", dir=workspace)
+
+        account = cookie_manager.acquire("instagram")
+        if not account:
+            logger.warning("cookies.txt tapılmadı!")
+
+        def cancel_hook(_):
+            if cancel_event.is_set():
+                raise yt_dlp.utils.DownloadCancelled()
+
+        ydl_opts = {
+            'format': 'best[ext=mp4]/best',
+            'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s'),
+            'quiet': True,
+            'no_warnings': True,
+            'progress_hooks': [cancel_hook] + ([progress_hook] if progress_hook else []),
+        }
+        ydl_opts.update(self._proxy_opts(route))
+
+        started = time.monotonic()
+        try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                cookie_manager.apply_to_ydl(ydl, account)
+                info = ydl.extract_info(url, download=True)
+        except yt_dlp.utils.DownloadCancelled:
+            logger.info("Instagram yt-dlp attempt cancelled")
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return None
+        except Exception as e:
+            cookie_manager.report_failure(account, e)
+            proxy_pool.report(route, error=e)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        cookie_manager.report_success(account)
+        proxy_pool.report(route, latency=time.monotonic() - started)
+
+        return self._collect_instagram_file(temp_dir, cancel_event, "yt-dlp", info)
+
+    def _instagram_instaloader_worker(self, cancel_event: threading.Event, url: str,
+                                      route=None, workspace: str = None) -> Optional[DownloadResult]:
+        """Download an Instagram video with instaloader (runs in executor)."""
+        shortcode = self._instagram_shortcode(url)
+        if not shortcode:
+            return None
 
-        # Yüklənmiş faylı tap
-            pattern = f'{temp_path}.*'
-            files = glob.glob(pattern)
+        temp_dir = tempfile.mkdtemp(prefix="instagram_loader_", dir=workspace)
+        loader, account = self._make_instaloader(temp_dir, route)
 
-            if files and os.path.exists(files[0]) and os.path.getsize(files[0]) > 0:
-                 downloaded_file = files[0]
-                 logger.info(f"Instagram video saved to: {downloaded_file} (size: {os.path.getsize(downloaded_file)} bytes)")
-                 return downloaded_file
+        started = time.monotonic()
+        try:
+            post = self._download_instagram_post(loader, shortcode)
+        except Exception as e:
+            cookie_manager.report_failure(account, e)
+            proxy_pool.report(route, error=e)
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+        cookie_manager.report_success(account)
+        proxy_pool.report(route, latency=time.monotonic() - started)
+        info = {
+            "id": shortcode,
+            "extractor_key": "Instagram",
+            "title": (post.caption or "") if post else "",
+            "uploader": post.owner_username if post else None,
+            "duration": post.video_duration if post else None,
+            "thumbnail": post.url if post else None,
+        }
+        return self._collect_instagram_file(temp_dir, cancel_event, "instaloader", info)
+
+    def _make_instaloader(self, dirname: str = None, route=None):
+        """Instaloader using a shared Instagram cookie account and the job's proxy route."""
+        loader = instaloader.Instaloader(
+            dirname_pattern=dirname or "{target}",
+            download_pictures=False,
+            download_video_thumbnails=False,
+            download_geotags=False,
+            download_comments=False,
+            save_metadata=False,
+            compress_json=False,
+            post_metadata_txt_pattern="",
+            quiet=True,
+        )
+
+        account = cookie_manager.acquire("instagram")
+        session = cookie_manager.as_dict(account, "instagram.com")
+        if "sessionid" in session and "csrftoken" in session:
+            loader.context.load_session(session.get("ds_user_id", account.name), session)
+        if route is not None and route.url:
+            # instaloader has no public proxy option; its requests session honours this
+            loader.context._session.proxies.update({'http': route.url, 'https': route.url})
+        return loader, account
+
+    def _instagram_post_worker(self, cancel_event: threading.Event, shortcode: str, route=None) -> Optional[dict]:
+        """
+        Resolve every item of a post in one metadata request (runs in executor).
+
+        Returns None if the post has no video and is not a carousel.
+        """
+        loader, account = self._make_instaloader(route=route)
+        started = time.monotonic()
+        try:
+            post = instaloader.Post.from_shortcode(loader.context, shortcode)
+            carousel = post.typename == "GraphSidecar"
+            if carousel:
+                items = [
+                    {
+                        "is_video": node.is_video,
+                        "url": node.video_url if node.is_video else node.display_url,
+                        "thumbnail": node.display_url,
+                    }
+                    for node in post.get_sidecar_nodes()
+                ]
+            elif post.is_video:
+                items = [{"is_video": True, "url": post.video_url, "thumbnail": post.url}]
             else:
-                logger.error(f"Instagram download failed or file is empty. Found files: {files}")
                 return None
+        except Exception as e:
+            cookie_manager.report_failure(account, e)
+            proxy_pool.report(route, error=e)
+            raise
+        cookie_manager.report_success(account)
+        proxy_pool.report(route, latency=time.monotonic() - started)
+        return {
+            "carousel": carousel,
+            "title": clean_title({"description": post.caption or "", "uploader": post.owner_username}),
+            "uploader": post.owner_username,
+            "items": items,
+            "info": {
+                "id": shortcode,
+                "extractor_key": "Instagram",
+                "title": post.caption or "",
+                "uploader": post.owner_username,
+                "duration": post.video_duration,
+                "thumbnail": post.url,
+            },
+        }
+
+    def _instagram_direct_worker(self, cancel_event: threading.Event, post: dict,
+                                 route=None, workspace: str = None) -> Optional[DownloadResult]:
+        """Fetch the video of an already resolved single-video post (runs in executor)."""
+        temp_dir = tempfile.mkdtemp(prefix="instagram_direct_", dir=workspace)
+        destination = os.path.join(temp_dir, f"{post['info']['id']}.mp4")
+        if not self._fetch_media_worker(cancel_event, post["items"][0]["url"], destination, route):
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return None
+        return self._collect_instagram_file(temp_dir, cancel_event, "resolved post", post["info"])
 
+    def _fetch_media_worker(self, cancel_event: threading.Event, media_url: str, destination: str,
+                            route=None) -> Optional[str]:
+        """Stream one media URL to disk (runs in executor)."""
+        proxies = {'http': route.url, 'https': route.url} if route is not None and route.url else None
+        try:
+            with requests.get(media_url, stream=True, timeout=30, proxies=proxies) as response:
+                response.raise_for_status()
+                with open(destination, "wb") as f:
+                    for chunk in response.iter_content(256 * 1024):
+                        if cancel_event.is_set():
+                            return None
+                        f.write(chunk)
         except Exception as e:
-            logger.error(f"Instagram download error: {e}", exc_info=True)
+            logger.warning(f"Failed to fetch {media_url[:80]}: {e}")
             return None
-    
+        return destination
+
+    def _collect_instagram_file(self, temp_dir: str, cancel_event: threading.Event, backend: str,
+                                info: dict = None) -> Optional[DownloadResult]:
+        """Return the downloaded video from a worker directory, discarding it if the attempt lost."""
+        if cancel_event.is_set():
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return None
+
+        files = [f for f in glob.glob(os.path.join(temp_dir, '*')) if not f.endswith(('.part', '.json', '.txt'))]
+        videos = [f for f in files if f.endswith('.mp4')] or files
+
+        if videos and os.path.getsize(videos[0]) > 0:
+            downloaded_file = videos[0]
+            logger.info(f"Instagram video saved via {backend} to: {downloaded_file} (size: {os.path.getsize(downloaded_file)} bytes)")
+            return DownloadResult.from_info(downloaded_file, info)
+
+        logger.error(f"Instagram {backend} download failed or file is empty. Found files: {files}")
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        return None
+
+    def _instagram_shortcode(self, url: str) -> Optional[str]:
+        """Extract the post shortcode from an Instagram URL."""
+        match = INSTAGRAM_SHORTCODE_RE.search(url)
+        return match.group(1) if match else None
+
     def _download_instagram_post(self, loader, shortcode):
         """Helper method to download Instagram post."""
         post = instaloader.Post.from_shortcode(loader.context, shortcode)
-        loader.download_post(post, target="")
+        if not post.is_video:
+            logger.info(f"Instagram post {shortcode} has no video")
+            return None
+        loader.download_post(post, target=shortcode)
+        return post
 
     async def _extract_video_title(self, url: str, platform: str) -> str:
         """Extract video title from URL."""
         try:
-            import random
-            
             # TikTok needs special handling
             if "tiktok.com" in url.lower():
-                user_agents = [
-                    'Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1',
-                    'Mozilla/5.0 (Linux; Android 12; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36',
-                    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-                ]
-                
+                profile = TIKTOK_HEADER_PROFILES[tiktok_profiles.ordered()[0]]
                 ydl_opts = {
                     'quiet': True,
                     'no_warnings': True,
                     'extract_flat': False,  # Full extraction needed for TikTok
-                    'user_agent': random.choice(user_agents),
-                    'http_headers': {
-                        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                        'Accept-Language': 'en-US,en;q=0.5',
-                        'Accept-Encoding': 'gzip, deflate',
-                        'DNT': '1',
-                        'Connection': 'keep-alive',
-                        'Upgrade-Insecure-Requests': '1'
-                    }
+                    'user_agent': profile['user_agent'],
+                    'http_headers': profile['headers'],
                 }
             else:
                 # For YouTube and Instagram
@@ -421,30 +1842,34 @@ class VideoDownloaderPlugin:
                     'extract_flat': True,
                 }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Try multiple title sources
-                title = (info.get('title') or 
-                        info.get('description', '').split('\n')[0] or
-                        info.get('uploader', '') or
-                        '')
-                
-                # Clean and truncate title if too long
-                if title:
-                    title = title.strip()
-                    if len(title) > 100:
-                        title = title[:97] + "..."
-                    logger.info(f"Extracted {platform} title: {title}")
-                    return title
-                else:
-                    logger.debug(f"No title found for {platform} video")
-                    return f"Video by {info.get('uploader', platform)}"
-                
+            info = await asyncio.get_running_loop().run_in_executor(None, self._extract_info, url, ydl_opts)
+            
+            # Try multiple title sources
+            title = (info.get('title') or 
+                    info.get('description', '').split('\n')[0] or
+                    info.get('uploader', '') or
+                    '')
+            
+            # Clean and truncate title if too long
+            if title:
+                title = title.strip()
+                if len(title) > 100:
+                    title = title[:97] + "..."
+                logger.info(f"Extracted {platform} title: {title}")
+                return title
+            else:
+                logger.debug(f"No title found for {platform} video")
+                return f"Video by {info.get('uploader', platform)}"
+            
         except Exception as e:
             logger.debug(f"Could not extract title from {url}: {e}")
             return ""
 
+    def _extract_info(self, url: str, ydl_opts: dict) -> dict:
+        """Run a metadata-only yt-dlp extraction (runs in executor)."""
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            return ydl.extract_info(url, download=False)
+
     async def _notify_admin_download(self, user, platform: str, url: str, video_title: str = None):
         """Send notification to admin about video download."""
         try:
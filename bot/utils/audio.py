@@ -0,0 +1,75 @@
+"""
+Audio extraction for the download plugins.
+Converts downloaded media into tagged MP3s (title, artist, cover art) with
+ffmpeg, in a bounded pool of worker processes separate from downloads.
+"""
+
+import asyncio
+import os
+import shutil
+from typing import Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+from bot.utils.media import DownloadResult, run_ffmpeg
+
+logger = setup_logger(__name__)
+
+class AudioExtractor:
+    """Bounded pool of ffmpeg MP3 encoders."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether ffmpeg is installed."""
+        return shutil.which("ffmpeg") is not None
+
+    async def extract_mp3(self, source: DownloadResult, bitrate: int, cover_path: str = None,
+                          output_dir: str = None) -> Optional[DownloadResult]:
+        """
+        Encode the audio track of source as an MP3 at bitrate kbit/s.
+
+        Tags the file with the title and uploader and embeds cover_path as
+        front cover art when given. The MP3 is written to output_dir (default:
+        next to the source). Returns None if ffmpeg fails.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        base = os.path.splitext(os.path.basename(source.path))[0]
+        output = os.path.join(output_dir or os.path.dirname(source.path), f"{base}.{bitrate}k.mp3")
+        args = ["-i", source.path]
+        if cover_path and os.path.exists(cover_path):
+            args += ["-i", cover_path, "-map", "0:a:0", "-map", "1:0", "-c:v", "mjpeg",
+                     "-metadata:s:v", "title=Album cover", "-metadata:s:v", "comment=Cover (front)"]
+        else:
+            args += ["-map", "0:a:0"]
+        args += ["-c:a", "libmp3lame", "-b:a", f"{bitrate}k", "-id3v2_version", "3"]
+        if source.title:
+            args += ["-metadata", f"title={source.title}"]
+        if source.uploader:
+            args += ["-metadata", f"artist={source.uploader}"]
+        args.append(output)
+
+        async with self._slots:
+            if not await run_ffmpeg(*args):
+                if os.path.exists(output):
+                    os.remove(output)
+                return None
+
+        logger.info(f"Extracted {bitrate}k MP3 from {os.path.basename(source.path)}")
+        audio = DownloadResult(
+            path=output,
+            title=source.title,
+            duration=source.duration,
+            thumbnail_url=source.thumbnail_url,
+            media_id=source.media_id,
+            uploader=source.uploader,
+        )
+        audio.thumbnail_path = cover_path
+        return audio
+
+# Global audio extractor instance
+audio_extractor = AudioExtractor(config.AUDIO_WORKERS)
@@ -0,0 +1,43 @@
+"""
+Stateless callback data for inline buttons.
+Buttons carry everything their callback needs (e.g. a video ID and the
+chosen format) plus a short HMAC, so callbacks need no server-side state,
+survive restarts and work across several bot instances sharing a token.
+"""
+
+import base64
+import hashlib
+import hmac
+from typing import List, Optional
+from bot.config import config
+
+SEPARATOR = "|"
+SIGNATURE_LENGTH = 11
+
+# Telegram limits callback_data to 64 bytes
+MAX_CALLBACK_DATA = 64
+
+def _secret() -> bytes:
+    """Signing key: CALLBACK_SECRET, or one derived from the bot token."""
+    secret = config.CALLBACK_SECRET or f"callback:{config.BOT_TOKEN}"
+    return hashlib.sha256(secret.encode()).digest()
+
+def _signature(payload: str) -> str:
+    """Short URL-safe HMAC of a payload."""
+    digest = hmac.new(_secret(), payload.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).decode()[:SIGNATURE_LENGTH]
+
+def pack(*fields) -> str:
+    """Join fields into signed callback data."""
+    payload = SEPARATOR.join(str(field) for field in fields)
+    data = f"{payload}{SEPARATOR}{_signature(payload)}"
+    if len(data.encode()) > MAX_CALLBACK_DATA:
+        raise ValueError(f"Callback data too long: {data}")
+    return data
+
+def unpack(data: str) -> Optional[List[str]]:
+    """Fields of signed callback data, or None if it was not signed by this bot."""
+    payload, _, signature = (data or "").rpartition(SEPARATOR)
+    if not payload or not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    return payload.split(SEPARATOR)
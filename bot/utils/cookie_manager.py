@@ -0,0 +1,175 @@
+"""
+Cookie jar manager for the download plugins.
+Parses Netscape cookie files once, reloads them when they change on disk and
+rotates between several accounts per platform with health tracking.
+"""
+
+import os
+import threading
+import time
+from http.cookiejar import MozillaCookieJar
+from typing import Dict, List, Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "plugins")
+
+# Error fragments that mean the account itself is being throttled or challenged
+THROTTLE_MARKERS = (
+    "429", "too many requests", "rate-limit", "rate limit",
+    "login required", "checkpoint", "please wait a few minutes",
+    "sign in to confirm",
+)
+
+class CookieAccount:
+    """A single account backed by one Netscape cookie file."""
+
+    def __init__(self, platform: str, path: str):
+        self.platform = platform
+        self.path = path
+        self.name = os.path.basename(path)
+        self.jar: Optional[MozillaCookieJar] = None
+        self.mtime: Optional[float] = None
+        self.last_used = 0.0
+        self.successes = 0
+        self.failures = 0
+        self.strikes = 0
+        self.cooldown_until = 0.0
+
+    def is_available(self, now: float) -> bool:
+        """Whether the account is out of cooldown."""
+        return now >= self.cooldown_until
+
+class CookieManager:
+    """Loads cookie files once, shares them across workers and rotates accounts."""
+
+    def __init__(self):
+        self.accounts: Dict[str, List[CookieAccount]] = {}
+        self._lock = threading.Lock()
+        self.register("instagram", config.INSTAGRAM_COOKIE_FILES or [os.path.join(PLUGIN_DIR, "cookies.txt")])
+        self.register("youtube", config.YOUTUBE_COOKIE_FILES or [os.path.join(PLUGIN_DIR, "cookieyt.txt")])
+
+    def register(self, platform: str, paths: List[str]):
+        """Register cookie files for a platform, skipping ones that don't exist."""
+        accounts = []
+        for path in paths:
+            if not os.path.isabs(path) and not os.path.exists(path):
+                path = os.path.join(PLUGIN_DIR, path)
+            if os.path.exists(path):
+                accounts.append(CookieAccount(platform, path))
+            else:
+                logger.warning(f"Cookie file for {platform} not found: {path}")
+        self.accounts[platform] = accounts
+        logger.info(f"Registered {len(accounts)} cookie account(s) for {platform}")
+
+    def acquire(self, platform: str) -> Optional[CookieAccount]:
+        """
+        Pick the next account for a platform.
+
+        Healthy accounts are used round-robin (least recently used first).
+        If every account is cooling down, the one that recovers soonest is used.
+        """
+        with self._lock:
+            accounts = self.accounts.get(platform) or []
+            if not accounts:
+                return None
+
+            now = time.time()
+            available = [account for account in accounts if account.is_available(now)]
+            if available:
+                account = min(available, key=lambda a: a.last_used)
+            else:
+                account = min(accounts, key=lambda a: a.cooldown_until)
+                logger.warning(f"All {platform} cookie accounts are cooling down, using {account.name}")
+
+            account.last_used = now
+            return account
+
+    def get_jar(self, account: CookieAccount) -> Optional[MozillaCookieJar]:
+        """Return the parsed jar for an account, reloading it if the file changed."""
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(account.path)
+            except OSError as e:
+                logger.error(f"Cookie file {account.path} is not readable: {e}")
+                return account.jar
+
+            if account.jar is None or mtime != account.mtime:
+                jar = MozillaCookieJar(account.path)
+                try:
+                    jar.load(ignore_discard=True, ignore_expires=True)
+                except Exception as e:
+                    logger.error(f"Failed to parse cookie file {account.path}: {e}")
+                    return account.jar
+                account.jar = jar
+                account.mtime = mtime
+                logger.info(f"Loaded {len(jar)} cookies from {account.name}")
+
+            return account.jar
+
+    def apply_to_ydl(self, ydl, account: Optional[CookieAccount]):
+        """Copy an account's cookies into a YoutubeDL instance's own cookie jar."""
+        if not account:
+            return
+        jar = self.get_jar(account)
+        if not jar:
+            return
+        for cookie in jar:
+            ydl.cookiejar.set_cookie(cookie)
+
+    def as_dict(self, account: Optional[CookieAccount], domain: str = "") -> Dict[str, str]:
+        """Return an account's cookies as a name/value dict, optionally filtered by domain."""
+        if not account:
+            return {}
+        jar = self.get_jar(account)
+        if not jar:
+            return {}
+        return {cookie.name: cookie.value for cookie in jar if domain in cookie.domain}
+
+    def report_success(self, account: Optional[CookieAccount]):
+        """Mark a successful request made with an account."""
+        if not account:
+            return
+        with self._lock:
+            account.successes += 1
+            account.strikes = 0
+
+    def report_failure(self, account: Optional[CookieAccount], error: Exception = None):
+        """Mark a failed request; throttling errors put the account on cooldown."""
+        if not account:
+            return
+        with self._lock:
+            account.failures += 1
+            if error is not None and self.is_throttle_error(error):
+                account.strikes += 1
+                cooldown = config.COOKIE_COOLDOWN * (2 ** (account.strikes - 1))
+                account.cooldown_until = time.time() + cooldown
+                logger.warning(f"{account.platform} account {account.name} throttled, cooling down for {cooldown}s")
+
+    @staticmethod
+    def is_throttle_error(error: Exception) -> bool:
+        """Check whether an error looks like account throttling."""
+        text = str(error).lower()
+        return any(marker in text for marker in THROTTLE_MARKERS)
+
+    def get_status(self) -> Dict[str, List[dict]]:
+        """Per-account health summary for diagnostics."""
+        now = time.time()
+        with self._lock:
+            return {
+                platform: [
+                    {
+                        "name": account.name,
+                        "successes": account.successes,
+                        "failures": account.failures,
+                        "cooldown": max(0, int(account.cooldown_until - now)),
+                    }
+                    for account in accounts
+                ]
+                for platform, accounts in self.accounts.items()
+            }
+
+# Global cookie manager instance
+cookie_manager = CookieManager()
@@ -208,6 +208,28 @@ def typing_action(func):
     
     return wrapper
 
+def own_task(func):
+    """
+    Decorator to run a handler in its own task.
+
+    Download jobs bind to the current task and cancel it when stopped by the
+    user or the watchdog. Run directly, that task is a dispatcher worker, and
+    a cancellation left on it leaks into every later update it handles.
+    """
+    
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        task = asyncio.create_task(func(*args, **kwargs))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            # Only the handler's task was cancelled: keep the worker alive
+            if asyncio.current_task().cancelling() or not task.cancelled():
+                raise
+            logger.warning(f"Handler '{func.__name__}' was cancelled")
+    
+    return wrapper
+
 def log_execution_time(func):
     """Decorator to log function execution time."""
     
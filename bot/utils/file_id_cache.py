@@ -0,0 +1,113 @@
+"""
+Telegram file ID cache.
+Maps a media ID plus variant (e.g. "mp3:192") to the file ID Telegram gave
+the bot when the file was first uploaded, so repeat requests are answered
+without downloading or uploading anything. Entries can also be found by
+content fingerprint, so the same bytes under another URL are not re-uploaded.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class FileIdCache:
+    """Bounded, persisted LRU of uploaded Telegram file IDs."""
+
+    def __init__(self, data_file: str, max_entries: int):
+        self.data_file = data_file
+        self.max_entries = max_entries
+        # key -> {"file_id": ..., "kind": ..., "time": ..., optional "content"/"sha256"/...}
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        # quick content fingerprint -> key
+        self.content_index: Dict[str, str] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.load()
+
+    @staticmethod
+    def key(media_id: str, variant: str) -> str:
+        """Cache key for one rendition of a media item."""
+        return f"{media_id}|{variant}"
+
+    def load(self):
+        """Load cached file IDs from disk."""
+        try:
+            if os.path.exists(self.data_file):
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    self.entries = OrderedDict(json.load(f))
+                self.content_index = {
+                    entry["content"]: key for key, entry in self.entries.items() if entry.get("content")
+                }
+                logger.info(f"Loaded {len(self.entries)} cached file IDs")
+        except Exception as e:
+            logger.error(f"Error loading file ID cache: {e}")
+            self.entries = OrderedDict()
+
+    def save(self):
+        """Write cached file IDs to disk."""
+        self._flush_handle = None
+        try:
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                json.dump(list(self.entries.items()), f, ensure_ascii=False, separators=(',', ':'))
+        except Exception as e:
+            logger.error(f"Error saving file ID cache: {e}")
+
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached entry for a key, marking it recently used."""
+        entry = self.entries.get(key)
+        if entry:
+            self.entries.move_to_end(key)
+            logger.info(f"File ID cache hit: {key}")
+        return entry
+
+    def find_content(self, quick: str) -> Optional[str]:
+        """Key of an entry whose content has this quick fingerprint."""
+        key = self.content_index.get(quick)
+        if key and key not in self.entries:
+            self.content_index.pop(quick, None)
+            return None
+        return key
+
+    def put(self, key: str, file_id: str, kind: str, **extra):
+        """Remember the file ID of an uploaded file."""
+        self._remove(key)
+        self.entries[key] = {"file_id": file_id, "kind": kind, "time": time.time(), **extra}
+        if extra.get("content"):
+            self.content_index[extra["content"]] = key
+        while len(self.entries) > self.max_entries:
+            self._remove(next(iter(self.entries)))
+        self._schedule_save()
+
+    def invalidate(self, key: str):
+        """Forget a file ID Telegram no longer accepts."""
+        if self._remove(key):
+            logger.info(f"File ID cache entry invalidated: {key}")
+            self._schedule_save()
+
+    def _remove(self, key: str) -> bool:
+        """Drop an entry and its content index mapping."""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        if entry.get("content") and self.content_index.get(entry["content"]) == key:
+            del self.content_index[entry["content"]]
+        return True
+
+    def _schedule_save(self):
+        """Coalesce writes: save at most once per second."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(1.0, self.save)
+
+# Global file ID cache instance
+file_id_cache = FileIdCache(config.FILE_ID_CACHE_FILE, config.FILE_ID_CACHE_SIZE)
@@ -0,0 +1,62 @@
+"""
+Content fingerprints for downloaded media.
+A cheap quick fingerprint (size plus sampled chunks) finds candidate
+duplicates; a full SHA-256 confirms them. Used to recognise the same clip
+reposted under different URLs.
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Optional
+
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_COUNT = 5
+
+def quick_fingerprint(path: str) -> str:
+    """Hash of the file size and a few evenly spaced chunks."""
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        if size <= SAMPLE_SIZE * SAMPLE_COUNT:
+            digest.update(f.read())
+        else:
+            step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+            for index in range(SAMPLE_COUNT):
+                f.seek(index * step)
+                digest.update(f.read(SAMPLE_SIZE))
+    return f"{size}:{digest.hexdigest()}"
+
+def _hash_stream(f) -> str:
+    """SHA-256 of an open file, closing it afterwards."""
+    with f:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ContentFingerprint:
+    """Quick and full content hashes of one downloaded file."""
+
+    def __init__(self, quick: str, full_task: asyncio.Future):
+        self.quick = quick
+        self._full_task = full_task
+        self._full: Optional[str] = None
+
+    async def full(self) -> str:
+        """The file's SHA-256, computed in the background."""
+        if self._full is None:
+            self._full = await self._full_task
+        return self._full
+
+async def content_fingerprint(path: str) -> ContentFingerprint:
+    """
+    Fingerprint a file right after download.
+
+    The file is opened before returning, so the full hash covers the bytes
+    as downloaded even if postprocessing replaces the file meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    quick = await loop.run_in_executor(None, quick_fingerprint, path)
+    full_task = loop.run_in_executor(None, _hash_stream, open(path, "rb"))
+    return ContentFingerprint(quick, full_task)
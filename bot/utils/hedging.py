@@ -0,0 +1,131 @@
+"""
+Hedged request helpers for the Telegram bot.
+Runs the same extraction through several backends and keeps the fastest result.
+"""
+
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+AttemptFactory = Callable[[], Awaitable[Any]]
+
+async def hedged_race(attempts: List[AttemptFactory], delay: float, name: str = "request",
+                      progressed=None) -> Optional[Any]:
+    """
+    Run attempts as a hedged race.
+
+    The first attempt starts immediately. Each following attempt starts once
+    `delay` seconds pass without a result, or right away when every running
+    attempt has already failed. The first non-empty result wins and all other
+    attempts are cancelled.
+
+    Args:
+        attempts: Zero-argument coroutine factories, in order of preference
+        delay: Seconds to wait before starting the next attempt
+        name: Label used in log messages
+        progressed: Optional event (threading or asyncio) set once a running
+            attempt is making progress; after that, further attempts start
+            only when every running attempt has failed
+
+    Returns:
+        The first non-empty result, or None if every attempt came back empty
+
+    Raises:
+        The last attempt error when every attempt failed with an exception
+    """
+    pending = set()
+    labels = {}
+    next_index = 0
+    last_error = None
+    empty_results = 0
+
+    def launch():
+        nonlocal next_index
+        task = asyncio.create_task(attempts[next_index]())
+        labels[task] = next_index
+        pending.add(task)
+        if next_index > 0:
+            logger.info(f"Hedging {name}: started attempt #{next_index + 1}")
+        next_index += 1
+
+    def hedging() -> bool:
+        return next_index < len(attempts) and not (progressed is not None and progressed.is_set())
+
+    launch()
+    try:
+        while pending:
+            timeout = delay if hedging() else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                pending.discard(task)
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is not None:
+                    logger.warning(f"Hedged {name} attempt #{labels[task] + 1} failed: {error}")
+                    last_error = error
+                    continue
+                result = task.result()
+                if result:
+                    logger.info(f"Hedged {name} won by attempt #{labels[task] + 1}")
+                    return result
+                empty_results += 1
+
+            # Start the next attempt when the delay expired or nothing is left running
+            if next_index < len(attempts) and ((not done and hedging()) or not pending):
+                launch()
+
+        logger.error(f"All {len(attempts)} hedged {name} attempts failed")
+        if last_error is not None and not empty_results:
+            raise last_error
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+class LatencyTracker:
+    """Keeps a rolling window of latencies to derive hedge delays from."""
+
+    def __init__(self, window: int = 100, min_samples: int = 5):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def add(self, seconds: float):
+        """Record a successful request latency."""
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float, default: float) -> float:
+        """Return the given latency percentile, or default while there is too little data."""
+        if len(self.samples) < self.min_samples:
+            return default
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+class ProfileScoreboard:
+    """Tracks per-profile success rates so the best profile is tried first."""
+
+    def __init__(self, names: List[str]):
+        self.scores: Dict[str, Dict[str, int]] = {name: {"success": 0, "attempts": 0} for name in names}
+
+    def record(self, name: str, success: bool):
+        """Record the outcome of an attempt made with a profile."""
+        score = self.scores.setdefault(name, {"success": 0, "attempts": 0})
+        score["attempts"] += 1
+        if success:
+            score["success"] += 1
+
+    def success_rate(self, name: str) -> float:
+        """Smoothed success rate, so untried profiles start at 50%."""
+        score = self.scores.get(name, {"success": 0, "attempts": 0})
+        return (score["success"] + 1) / (score["attempts"] + 2)
+
+    def ordered(self) -> List[str]:
+        """Profile names from best to worst success rate."""
+        return sorted(self.scores, key=self.success_rate, reverse=True)
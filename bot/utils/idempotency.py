@@ -0,0 +1,177 @@
+"""
+Idempotency store for incoming updates.
+Remembers recently handled message and callback IDs so updates redelivered
+after a restart, or double-tapped buttons, are not processed twice. The
+window is saved to disk and, when Gist storage is configured for the stats
+manager, to the same Gist, since deployments start from a fresh checkout.
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+import requests
+from bot.config import config
+from bot.utils.logger import setup_logger
+from bot.utils.stats_manager import stats_manager
+
+logger = setup_logger(__name__)
+
+STARTED = "s"
+DONE = "d"
+GIST_FILE = "processed_updates.json"
+
+class IdempotencyStore:
+    """Bounded window of recently claimed update keys."""
+
+    def __init__(self, data_file: str, max_entries: int, ttl: int):
+        self.data_file = data_file
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.boot_id = uuid.uuid4().hex[:8]
+        # key -> [timestamp, state, boot_id]
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._sync_handle: Optional[asyncio.TimerHandle] = None
+        self.load()
+
+    def load(self):
+        """Load the recent-ID window from the Gist, or from disk without one."""
+        try:
+            entries = self._load_gist()
+            if entries is None and os.path.exists(self.data_file):
+                with open(self.data_file, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+            if entries is not None:
+                self.entries = OrderedDict(entries)
+                self._evict()
+                logger.info(f"Loaded {len(self.entries)} recent update IDs")
+        except Exception as e:
+            logger.error(f"Error loading idempotency store: {e}")
+            self.entries = OrderedDict()
+
+    def save(self):
+        """Write the recent-ID window to disk and the Gist (blocking; used at shutdown)."""
+        self._save_local()
+        self._save_gist(self._serialize())
+
+    def _serialize(self) -> str:
+        """The window as compact JSON."""
+        return json.dumps(list(self.entries.items()), separators=(',', ':'))
+
+    def _save_local(self):
+        """Write the recent-ID window to disk."""
+        self._flush_handle = None
+        try:
+            with open(self.data_file, 'w', encoding='utf-8') as f:
+                f.write(self._serialize())
+        except Exception as e:
+            logger.error(f"Error saving idempotency store: {e}")
+
+    def _gist(self) -> Optional[tuple]:
+        """(token, gist ID) of the stats Gist, if Gist storage is configured."""
+        if stats_manager.github_token and stats_manager.gist_id:
+            return stats_manager.github_token, stats_manager.gist_id
+        return None
+
+    def _load_gist(self) -> Optional[list]:
+        """The window stored in the Gist, or None if there is none."""
+        gist = self._gist()
+        if not gist:
+            return None
+        token, gist_id = gist
+        headers = {"Authorization": f"token {token}"}
+        response = requests.get(f"https://api.github.com/gists/{gist_id}", headers=headers, timeout=10)
+        if response.status_code != 200:
+            logger.warning(f"Could not load update IDs from Gist: {response.status_code}")
+            return None
+        stored = response.json().get("files", {}).get(GIST_FILE)
+        if not stored:
+            return None
+        content = stored["content"]
+        if stored.get("truncated"):
+            content = requests.get(stored["raw_url"], headers=headers, timeout=10).text
+        return json.loads(content)
+
+    def _save_gist(self, content: str):
+        """Write the window to the Gist."""
+        self._sync_handle = None
+        gist = self._gist()
+        if not gist:
+            return
+        token, gist_id = gist
+        try:
+            response = requests.patch(
+                f"https://api.github.com/gists/{gist_id}",
+                headers={"Authorization": f"token {token}"},
+                json={"files": {GIST_FILE: {"content": content}}},
+                timeout=10,
+            )
+            if response.status_code != 200:
+                logger.warning(f"Error saving update IDs to Gist: {response.status_code}")
+        except Exception as e:
+            logger.error(f"Error saving update IDs to Gist: {e}")
+
+    def claim(self, key: str) -> bool:
+        """
+        Try to claim an update key.
+
+        Returns False if the key was already completed, or is still running in
+        this process. A key left unfinished by a previous process (crash before
+        the result was sent) can be claimed again.
+        """
+        self._evict()
+        entry = self.entries.get(key)
+        if entry:
+            _, state, boot_id = entry
+            if state == DONE or boot_id == self.boot_id:
+                logger.info(f"Duplicate update skipped: {key}")
+                return False
+            logger.info(f"Retrying update left unfinished by a previous run: {key}")
+
+        self.entries[key] = [time.time(), STARTED, self.boot_id]
+        self.entries.move_to_end(key)
+        self._schedule_save()
+        return True
+
+    def complete(self, key: str):
+        """Mark a claimed key as fully handled."""
+        self.entries[key] = [time.time(), DONE, self.boot_id]
+        self.entries.move_to_end(key)
+        self._schedule_save()
+
+    def release(self, key: str):
+        """Forget a claimed key so a later retry is allowed."""
+        if self.entries.pop(key, None) is not None:
+            self._schedule_save()
+
+    def _evict(self):
+        """Drop expired entries and keep the window bounded."""
+        cutoff = time.time() - self.ttl
+        while self.entries:
+            key, (timestamp, _, _) = next(iter(self.entries.items()))
+            if timestamp >= cutoff and len(self.entries) <= self.max_entries:
+                break
+            self.entries.popitem(last=False)
+
+    def _schedule_save(self):
+        """Coalesce writes: to disk at most once per second, to the Gist once per sync interval."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(1.0, self._save_local)
+        if self._sync_handle is None and self._gist():
+            self._sync_handle = loop.call_later(config.IDEMPOTENCY_SYNC_INTERVAL, self._sync_gist)
+
+    def _sync_gist(self):
+        """Upload the current window to the Gist without blocking the event loop."""
+        asyncio.get_running_loop().run_in_executor(None, self._save_gist, self._serialize())
+
+# Global idempotency store instance
+idempotency_store = IdempotencyStore(config.IDEMPOTENCY_FILE, config.IDEMPOTENCY_WINDOW, config.IDEMPOTENCY_TTL)
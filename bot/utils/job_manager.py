@@ -0,0 +1,176 @@
+"""
+Download job management for the Telegram bot.
+Limits concurrent jobs, gives every job its own workspace, enforces per-stage
+deadlines with a watchdog and lets users cancel running jobs. Download and
+upload deadlines are stall timeouts that restart whenever bytes move.
+"""
+
+import asyncio
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class JobCancelled(Exception):
+    """Raised inside executor workers when their job was cancelled."""
+
+class DownloadJob:
+    """A single download job and its cancellation state."""
+
+    def __init__(self, user_id: int, chat_id: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.workspace = tempfile.mkdtemp(prefix=f"job_{self.id}_")
+        self.cancel_event = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.stage: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self.hard_deadline: Optional[float] = None
+        self.timed_out_stage: Optional[str] = None
+        self.cancelled_by_user = False
+        self.holds_slot = False
+        self.created_at = time.time()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the job was cancelled by the user or the watchdog."""
+        return self.cancel_event.is_set()
+
+    def enter_stage(self, stage: str):
+        """Switch to a new stage and restart the watchdog deadline for it."""
+        self.stage = stage
+        now = time.monotonic()
+        timeout = config.STAGE_TIMEOUTS.get(stage)
+        self.deadline = now + timeout if timeout else None
+        max_timeout = config.STAGE_MAX_TIMEOUTS.get(stage)
+        self.hard_deadline = now + max_timeout if max_timeout else None
+        logger.debug(f"Job {self.id} entered stage '{stage}' (timeout {timeout}s, cap {max_timeout or '-'}s)")
+
+    def report_progress(self):
+        """
+        Restart the deadline of a stall-timed stage (download, upload).
+
+        Called from progress callbacks, so a large transfer that keeps moving
+        is only stopped by the stage's hard cap. Safe to call from threads.
+        """
+        if self.stage not in config.STAGE_MAX_TIMEOUTS:
+            return
+        timeout = config.STAGE_TIMEOUTS.get(self.stage)
+        if timeout:
+            self.deadline = time.monotonic() + timeout
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled; safe to call from threads."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+
+    def cancel(self):
+        """Cancel the job cooperatively: flag executor workers and cancel the task."""
+        self.cancel_event.set()
+        if self.task and not self.task.done():
+            self.task.cancel()
+
+class JobManager:
+    """Schedules download jobs under global and per-user concurrency limits."""
+
+    def __init__(self, max_jobs: int, max_jobs_per_user: int):
+        self.max_jobs = max_jobs
+        self.max_jobs_per_user = max_jobs_per_user
+        self.jobs: Dict[str, DownloadJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._user_slots: Dict[int, asyncio.Semaphore] = {}
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def run(self, user_id: int, chat_id: int, task: asyncio.Task = None):
+        """
+        Run a job under the concurrency limits.
+
+        The job's slot and workspace are released as soon as the block exits,
+        including when it was cancelled or timed out.
+        """
+        self._ensure_started()
+        user_slots = self._user_slots.setdefault(user_id, asyncio.Semaphore(self.max_jobs_per_user))
+        job = DownloadJob(user_id, chat_id)
+        job.task = task or asyncio.current_task()
+        self.jobs[job.id] = job
+
+        try:
+            async with user_slots:
+                await self._slots.acquire()
+                job.holds_slot = True
+                try:
+                    logger.info(f"Job {job.id} started for user {user_id} ({len(self.jobs)} tracked)")
+                    yield job
+                finally:
+                    if job.holds_slot:
+                        job.holds_slot = False
+                        self._slots.release()
+        finally:
+            self.jobs.pop(job.id, None)
+            shutil.rmtree(job.workspace, ignore_errors=True)
+            logger.info(f"Job {job.id} finished, slot and workspace released")
+
+    @asynccontextmanager
+    async def released_slot(self, job: DownloadJob):
+        """
+        Give a job's global slot back while the block runs.
+
+        For waits that are not downloads (e.g. a transcode), so they don't
+        hold up other users' downloads. The slot is taken again afterwards;
+        the user's own slot is kept throughout. If the block raises, the
+        slot is not taken again.
+        """
+        if not job.holds_slot:
+            yield
+            return
+        job.holds_slot = False
+        self._slots.release()
+        yield
+        await self._slots.acquire()
+        job.holds_slot = True
+
+    def get(self, job_id: str) -> Optional[DownloadJob]:
+        """Return a running job by ID."""
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str, user_id: int) -> bool:
+        """Cancel a job on behalf of its owner."""
+        job = self.jobs.get(job_id)
+        if not job or job.user_id != user_id:
+            return False
+        job.cancelled_by_user = True
+        job.cancel()
+        logger.info(f"Job {job_id} cancelled by user {user_id}")
+        return True
+
+    def _ensure_started(self):
+        """Create loop-bound primitives and start the watchdog on first use."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_jobs)
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        """Cancel jobs that overrun their current stage deadline."""
+        while True:
+            await asyncio.sleep(config.WATCHDOG_INTERVAL)
+            now = time.monotonic()
+            for job in list(self.jobs.values()):
+                overdue = any(deadline is not None and now > deadline
+                              for deadline in (job.deadline, job.hard_deadline))
+                if overdue and not job.cancelled:
+                    job.timed_out_stage = job.stage
+                    logger.warning(f"Job {job.id} exceeded the '{job.stage}' deadline, cancelling")
+                    job.cancel()
+
+# Global job manager instance
+job_manager = JobManager(config.MAX_CONCURRENT_JOBS, config.MAX_JOBS_PER_USER)
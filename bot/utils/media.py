@@ -0,0 +1,230 @@
+"""
+Media helpers for the download plugins.
+Carries extraction metadata alongside downloaded files and prepares MP4s for
+streaming playback in Telegram (faststart remux, ffprobe fallbacks, splitting
+oversized files into parts).
+"""
+
+import asyncio
+import glob
+import json
+import math
+import os
+import shutil
+import struct
+from typing import List, Optional
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MP4_EXTENSIONS = (".mp4", ".m4v", ".mov")
+
+class DownloadResult:
+    """A downloaded file plus the metadata needed to upload it properly."""
+
+    def __init__(self, path: str, title: str = None, duration: int = None, width: int = None,
+                 height: int = None, thumbnail_url: str = None, media_id: str = None, uploader: str = None):
+        self.path = path
+        self.title = title
+        self.duration = duration
+        self.width = width
+        self.height = height
+        self.thumbnail_url = thumbnail_url
+        self.thumbnail_path: Optional[str] = None
+        self.media_id = media_id
+        self.uploader = uploader
+
+    @classmethod
+    def from_info(cls, path: str, info: dict) -> "DownloadResult":
+        """Build a result from a yt-dlp info dict."""
+        info = info or {}
+        # Merged formats report their dimensions on the requested download
+        requested = (info.get("requested_downloads") or [{}])[0]
+        duration = info.get("duration") or requested.get("duration")
+        extractor = (info.get("extractor_key") or info.get("extractor") or "").lower()
+        return cls(
+            path=path,
+            title=clean_title(info),
+            duration=int(duration) if duration else None,
+            width=requested.get("width") or info.get("width"),
+            height=requested.get("height") or info.get("height"),
+            thumbnail_url=info.get("thumbnail"),
+            media_id=f"{extractor}:{info['id']}" if extractor and info.get("id") else None,
+            uploader=info.get("uploader"),
+        )
+
+    @property
+    def size(self) -> int:
+        """File size in bytes."""
+        return os.path.getsize(self.path)
+
+    def exists(self) -> bool:
+        """Whether the file is present and not empty."""
+        return bool(self.path) and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def video_kwargs(self) -> dict:
+        """Keyword arguments for Pyrogram's send_video/reply_video."""
+        kwargs = {"supports_streaming": True}
+        if self.duration:
+            kwargs["duration"] = int(self.duration)
+        if self.width and self.height:
+            kwargs["width"] = int(self.width)
+            kwargs["height"] = int(self.height)
+        if self.thumbnail_path and os.path.exists(self.thumbnail_path):
+            kwargs["thumb"] = self.thumbnail_path
+        return kwargs
+
+    def audio_kwargs(self) -> dict:
+        """Keyword arguments for Pyrogram's send_audio."""
+        kwargs = {}
+        if self.duration:
+            kwargs["duration"] = int(self.duration)
+        if self.title:
+            kwargs["title"] = self.title
+        if self.uploader:
+            kwargs["performer"] = self.uploader
+        if self.thumbnail_path and os.path.exists(self.thumbnail_path):
+            kwargs["thumb"] = self.thumbnail_path
+        return kwargs
+
+def clean_title(info: dict) -> str:
+    """Pick a display title from yt-dlp metadata, truncated for captions."""
+    title = (info.get('title') or
+             (info.get('description') or '').split('\n')[0] or
+             info.get('uploader') or
+             '')
+    title = title.strip()
+    if len(title) > 100:
+        title = title[:97] + "..."
+    return title
+
+def needs_faststart(path: str) -> bool:
+    """Check whether an MP4's moov atom comes after its media data."""
+    if not path.lower().endswith(MP4_EXTENSIONS):
+        return False
+    try:
+        with open(path, "rb") as f:
+            file_size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset < file_size:
+                f.seek(offset)
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                size, box_type = struct.unpack(">I4s", header)
+                if size == 1:
+                    size = struct.unpack(">Q", f.read(8))[0]
+                elif size == 0:
+                    size = file_size - offset
+                if box_type == b"moov":
+                    return False
+                if box_type == b"mdat":
+                    return True
+                if size < 8:
+                    return False
+                offset += size
+    except OSError as e:
+        logger.warning(f"Could not inspect MP4 atoms of {path}: {e}")
+    return False
+
+async def run_ffmpeg(*args: str) -> bool:
+    """Run ffmpeg quietly, returning whether it succeeded."""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        process.kill()
+        raise
+    if process.returncode != 0:
+        logger.warning(f"ffmpeg failed ({process.returncode}): {stderr.decode(errors='ignore')[-300:]}")
+        return False
+    return True
+
+async def remux_faststart(path: str) -> str:
+    """Move the moov atom to the front with a stream copy (no re-encode)."""
+    if not shutil.which("ffmpeg") or not needs_faststart(path):
+        return path
+
+    base, _ = os.path.splitext(path)
+    output = f"{base}.faststart.mp4"
+    if await run_ffmpeg("-i", path, "-map", "0:v?", "-map", "0:a?", "-c", "copy", "-movflags", "+faststart", output):
+        os.replace(output, path)
+        logger.info(f"Remuxed {os.path.basename(path)} for faststart playback")
+        return path
+
+    if os.path.exists(output):
+        os.remove(output)
+    return path
+
+async def probe_video(path: str) -> dict:
+    """Read duration and dimensions with ffprobe."""
+    if not shutil.which("ffprobe"):
+        return {}
+    process = await asyncio.create_subprocess_exec(
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "stream=width,height:format=duration",
+        "-of", "json", path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    stdout, _ = await process.communicate()
+    try:
+        data = json.loads(stdout or b"{}")
+    except ValueError:
+        return {}
+    stream = (data.get("streams") or [{}])[0]
+    duration = (data.get("format") or {}).get("duration")
+    return {
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "duration": int(float(duration)) if duration else None,
+    }
+
+async def prepare_for_streaming(result: DownloadResult) -> DownloadResult:
+    """Make an MP4 streamable and fill in metadata the extractor didn't provide."""
+    result.path = await remux_faststart(result.path)
+    if not (result.duration and result.width and result.height):
+        probed = await probe_video(result.path)
+        result.duration = result.duration or probed.get("duration")
+        result.width = result.width or probed.get("width")
+        result.height = result.height or probed.get("height")
+    return result
+
+async def split_video(path: str, duration: float, limit_bytes: int) -> List[str]:
+    """
+    Split a video into independently playable parts below limit_bytes.
+
+    Stream-copies into MP4 segments cut at keyframes. Keyframe alignment can
+    make a part overshoot its share, so the split is redone with more parts
+    if any segment is still too large. Returns an empty list on failure.
+    """
+    if not shutil.which("ffmpeg") or not duration:
+        return []
+
+    base, _ = os.path.splitext(path)
+    size = os.path.getsize(path)
+    parts_count = math.ceil(size / (limit_bytes * 0.9))
+    for _ in range(3):
+        segment_time = max(1, int(duration / parts_count))
+        pattern = f"{base}.part%03d.mp4"
+        ok = await run_ffmpeg(
+            "-i", path, "-map", "0:v?", "-map", "0:a?", "-c", "copy",
+            "-f", "segment", "-segment_time", str(segment_time), "-reset_timestamps", "1",
+            "-segment_format_options", "movflags=+faststart",
+            pattern,
+        )
+        parts = sorted(glob.glob(f"{glob.escape(base)}.part*.mp4"))
+        if ok and parts and all(os.path.getsize(part) <= limit_bytes for part in parts):
+            logger.info(f"Split {os.path.basename(path)} into {len(parts)} parts of ~{segment_time}s")
+            return parts
+        for part in parts:
+            os.remove(part)
+        if not ok:
+            return []
+        parts_count += max(1, parts_count // 2)
+    logger.warning(f"Could not split {os.path.basename(path)} below {limit_bytes} bytes")
+    return []
@@ -0,0 +1,147 @@
+"""
+Outbound proxy pool for the download plugins.
+Scores every egress route by latency and error rate, cools down routes that
+get rate-limited and keeps a job on the same route for its whole lifetime.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+DIRECT = ""
+
+# Error fragments that mean the route (not the account) is being blocked
+BLOCK_MARKERS = ("429", "403", "too many requests", "forbidden", "rate-limit", "rate limit")
+
+class ProxyRoute:
+    """One egress route: a proxy URL or the direct connection."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.strikes = 0
+        self.cooldown_until = 0.0
+        self.active_jobs = 0
+
+    @property
+    def label(self) -> str:
+        """Printable route name without credentials."""
+        if not self.url:
+            return "direct"
+        return self.url.split("@")[-1]
+
+    def score(self) -> float:
+        """Lower is better. Untested routes score 0 so they get tried."""
+        if self.latency is None:
+            return 0.0
+        return self.latency * (1 + 4 * self.error_rate) * (1 + self.active_jobs)
+
+class ProxyPool:
+    """Health-scored proxy selection with sticky per-job assignment."""
+
+    ALPHA = 0.3  # EWMA weight of the newest sample
+
+    def __init__(self, urls: List[str], include_direct: bool = True, cooldown: int = 300):
+        self.routes: List[ProxyRoute] = [ProxyRoute(url) for url in urls]
+        if include_direct or not self.routes:
+            self.routes.append(ProxyRoute(DIRECT))
+        self.cooldown = cooldown
+        self.sticky: Dict[str, Tuple[ProxyRoute, float]] = {}
+        self.sticky_ttl = 600
+        self._lock = threading.Lock()
+        logger.info(f"Proxy pool initialized with {len(self.routes)} route(s)")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether there is more than the direct connection to choose from."""
+        return any(route.url for route in self.routes)
+
+    def acquire(self, job_key: str) -> ProxyRoute:
+        """Return the route for a job, keeping it stable while the route is healthy."""
+        with self._lock:
+            now = time.time()
+            self._expire_sticky(now)
+
+            assigned = self.sticky.get(job_key)
+            if assigned and now >= assigned[0].cooldown_until:
+                route = assigned[0]
+            else:
+                available = [route for route in self.routes if now >= route.cooldown_until]
+                if available:
+                    route = min(available, key=lambda r: r.score())
+                else:
+                    route = min(self.routes, key=lambda r: r.cooldown_until)
+                    logger.warning(f"All proxy routes are cooling down, using {route.label}")
+                if assigned:
+                    assigned[0].active_jobs -= 1
+                route.active_jobs += 1
+
+            self.sticky[job_key] = (route, now + self.sticky_ttl)
+            return route
+
+    def release(self, job_key: str):
+        """Drop a job's sticky assignment once the job is finished."""
+        with self._lock:
+            assigned = self.sticky.pop(job_key, None)
+            if assigned:
+                assigned[0].active_jobs -= 1
+
+    def report(self, route: Optional[ProxyRoute], latency: float = None, error: Exception = None):
+        """Record the outcome of a request made through a route."""
+        if route is None:
+            return
+        with self._lock:
+            route.requests += 1
+            failed = error is not None
+            route.error_rate = (1 - self.ALPHA) * route.error_rate + self.ALPHA * (1.0 if failed else 0.0)
+
+            if not failed:
+                route.strikes = 0
+                if latency is not None:
+                    route.latency = latency if route.latency is None else (1 - self.ALPHA) * route.latency + self.ALPHA * latency
+                return
+
+            route.errors += 1
+            if self.is_block_error(error):
+                route.strikes += 1
+                cooldown = self.cooldown * (2 ** (route.strikes - 1))
+                route.cooldown_until = time.time() + cooldown
+                logger.warning(f"Proxy route {route.label} blocked, cooling down for {cooldown}s")
+
+    @staticmethod
+    def is_block_error(error: Exception) -> bool:
+        """Check whether an error means the route is rate-limited or blocked."""
+        text = str(error).lower()
+        return any(marker in text for marker in BLOCK_MARKERS)
+
+    def _expire_sticky(self, now: float):
+        """Forget sticky assignments of jobs that never released them."""
+        for key in [key for key, (_, expires) in self.sticky.items() if expires < now]:
+            route, _ = self.sticky.pop(key)
+            route.active_jobs -= 1
+
+    def get_status(self) -> List[dict]:
+        """Per-route health summary for diagnostics."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "route": route.label,
+                    "latency": round(route.latency, 2) if route.latency is not None else None,
+                    "error_rate": round(route.error_rate, 2),
+                    "requests": route.requests,
+                    "active_jobs": route.active_jobs,
+                    "cooldown": max(0, int(route.cooldown_until - now)),
+                }
+                for route in self.routes
+            ]
+
+# Global proxy pool instance
+proxy_pool = ProxyPool(config.PROXY_URLS, config.PROXY_INCLUDE_DIRECT, config.PROXY_COOLDOWN)
@@ -0,0 +1,161 @@
+"""
+Retry and circuit breaker helpers for the download plugins.
+Retries transient upstream failures with jittered exponential backoff and
+fast-fails requests to a platform while it is down.
+"""
+
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Any
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Error fragments that indicate a temporary upstream or network problem
+TRANSIENT_MARKERS = (
+    "timed out", "timeout", "connection reset", "connection aborted",
+    "connection refused", "remote end closed", "temporary failure",
+    "name resolution", "incompleteread", "http error 500", "http error 502",
+    "http error 503", "http error 504", "bad gateway", "service unavailable",
+)
+
+class CircuitOpenError(Exception):
+    """Raised when a platform's circuit breaker is open."""
+
+    def __init__(self, platform: str, retry_after: float):
+        super().__init__(f"{platform} circuit is open, retry in {int(retry_after)}s")
+        self.platform = platform
+        self.retry_after = retry_after
+
+def is_transient_error(error: BaseException) -> bool:
+    """Check whether an error is worth retrying."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    text = str(error).lower()
+    return any(marker in text for marker in TRANSIENT_MARKERS)
+
+async def retry_async(func: Callable[[], Awaitable[Any]], attempts: int = None,
+                      base_delay: float = None, max_delay: float = 30.0, name: str = "request") -> Any:
+    """
+    Call func, retrying transient errors with full-jitter exponential backoff.
+
+    Args:
+        func: Zero-argument coroutine factory
+        attempts: Maximum number of calls (defaults to config.RETRY_ATTEMPTS)
+        base_delay: Backoff base in seconds (defaults to config.RETRY_BASE_DELAY)
+        max_delay: Upper bound of a single backoff sleep
+        name: Label used in log messages
+
+    Returns:
+        Whatever func returns; non-transient errors are raised immediately
+    """
+    attempts = attempts or config.RETRY_ATTEMPTS
+    base_delay = base_delay if base_delay is not None else config.RETRY_BASE_DELAY
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return await func()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if attempt >= attempts or not is_transient_error(e):
+                raise
+            sleep_for = random.uniform(0, min(max_delay, base_delay * (2 ** (attempt - 1))))
+            logger.warning(f"Transient error in {name} (attempt {attempt}/{attempts}): {e}; retrying in {sleep_for:.1f}s")
+            await asyncio.sleep(sleep_for)
+
+class CircuitBreaker:
+    """
+    Per-platform circuit breaker.
+
+    closed    - requests pass, consecutive failures are counted
+    open      - requests fail fast until the recovery timeout passes
+    half_open - a limited number of trial requests probe the platform
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, platform: str, failure_threshold: int, recovery_timeout: float, half_open_max_calls: int = 1):
+        self.platform = platform
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_calls = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError if the request must not reach the platform."""
+        if self.state == self.OPEN:
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.recovery_timeout:
+                raise CircuitOpenError(self.platform, self.recovery_timeout - elapsed)
+            self.state = self.HALF_OPEN
+            self.trial_calls = 0
+            logger.info(f"Circuit for {self.platform} is half-open, probing")
+
+        if self.state == self.HALF_OPEN:
+            if self.trial_calls >= self.half_open_max_calls:
+                raise CircuitOpenError(self.platform, self.recovery_timeout)
+            self.trial_calls += 1
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.platform} closed again")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_calls = 0
+
+    def record_failure(self):
+        """Count an upstream failure and open the circuit when the threshold is hit."""
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.platform} opened after {self.failures} failure(s)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.trial_calls = 0
+
+    def release_trial(self):
+        """Give back a half-open trial slot when the call ended without a verdict."""
+        if self.state == self.HALF_OPEN and self.trial_calls > 0:
+            self.trial_calls -= 1
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run func through the breaker.
+
+        Only transient errors and timeouts count as platform failures. Empty
+        results (photo-only posts, private or deleted media) and other errors
+        depend on the link, not the platform, and leave the circuit untouched.
+        """
+        self.before_call()
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self.release_trial()
+            raise
+        except Exception as e:
+            if is_transient_error(e):
+                self.record_failure()
+            else:
+                self.release_trial()
+            raise
+
+        if result:
+            self.record_success()
+        else:
+            self.release_trial()
+        return result
+
+# One breaker per platform
+circuit_breakers: Dict[str, CircuitBreaker] = {
+    platform: CircuitBreaker(platform, config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RECOVERY_TIMEOUT)
+    for platform in ("tiktok", "instagram", "youtube")
+}
@@ -0,0 +1,108 @@
+"""
+Short-lived cache of downloaded source files.
+Keeps recently downloaded media on disk for a few minutes, keyed by media ID,
+so a follow-up request for the same media (e.g. MP3 after video) is served
+by local processing instead of another download.
+"""
+
+import os
+import shutil
+import time
+from collections import OrderedDict
+from typing import Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+from bot.utils.media import DownloadResult
+
+logger = setup_logger(__name__)
+
+class SourceCache:
+    """TTL- and size-bounded store of downloaded files."""
+
+    def __init__(self, cache_dir: str, ttl: int, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # media_id -> (DownloadResult, expires_at)
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Metadata lives in memory only, so files left by a previous run are useless.
+        # They live in a subdirectory of their own, so SOURCE_CACHE_DIR may be
+        # shared with other files without those being wiped
+        self.files_dir = os.path.join(cache_dir, "video_bot_sources")
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+
+    def put(self, result: DownloadResult):
+        """
+        Move a finished download into the cache.
+
+        Must be called after the file has been sent; the original path no
+        longer exists afterwards.
+        """
+        if self.ttl <= 0 or not result.media_id or not result.exists():
+            return
+        if result.size > self.max_bytes:
+            return
+
+        self._drop(result.media_id)
+        safe_name = result.media_id.replace(":", "_").replace("/", "_")
+        target = os.path.join(self.files_dir, f"{safe_name}{os.path.splitext(result.path)[1]}")
+        try:
+            shutil.move(result.path, target)
+        except OSError as e:
+            logger.warning(f"Could not cache source {result.path}: {e}")
+            return
+
+        cached = DownloadResult(
+            path=target,
+            title=result.title,
+            duration=result.duration,
+            width=result.width,
+            height=result.height,
+            thumbnail_url=result.thumbnail_url,
+            media_id=result.media_id,
+            uploader=result.uploader,
+        )
+        self.entries[result.media_id] = (cached, time.monotonic() + self.ttl)
+        self._evict()
+        logger.info(f"Cached source for {result.media_id} for {self.ttl}s")
+
+    def get(self, media_id: str) -> Optional[DownloadResult]:
+        """Return a cached source for media_id, extending its lifetime."""
+        self._evict()
+        entry = self.entries.get(media_id)
+        if not entry:
+            return None
+        cached, _ = entry
+        if not cached.exists():
+            self._drop(media_id)
+            return None
+        self.entries[media_id] = (cached, time.monotonic() + self.ttl)
+        self.entries.move_to_end(media_id)
+        logger.info(f"Source cache hit: {media_id}")
+        return cached
+
+    def _drop(self, media_id: str):
+        """Remove an entry and its file."""
+        entry = self.entries.pop(media_id, None)
+        if entry:
+            try:
+                os.remove(entry[0].path)
+            except OSError:
+                pass
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones until the size budget fits."""
+        now = time.monotonic()
+        for media_id, (_, expires_at) in list(self.entries.items()):
+            if expires_at <= now:
+                self._drop(media_id)
+
+        total = sum(cached.size for cached, _ in self.entries.values() if cached.exists())
+        while total > self.max_bytes and self.entries:
+            media_id, (cached, _) = next(iter(self.entries.items()))
+            total -= cached.size if cached.exists() else 0
+            self._drop(media_id)
+
+# Global source cache instance
+source_cache = SourceCache(config.SOURCE_CACHE_DIR, config.SOURCE_CACHE_TTL, config.SOURCE_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,107 @@
+"""
+Speculative work for the download plugins.
+Starts cheap preparatory work (e.g. metadata extraction) while the user is
+still choosing what to download, under a small concurrency budget. Results
+that are not used within a TTL are cancelled and dropped.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class SpeculativeTasks:
+    """Keyed background tasks with a running budget and an idle TTL."""
+
+    def __init__(self, budget: int, ttl: int):
+        self.budget = budget
+        self.ttl = ttl
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._expiry: Dict[str, asyncio.TimerHandle] = {}
+        self._on_unused: Dict[str, Callable[[], None]] = {}
+
+    @property
+    def running(self) -> int:
+        """Number of speculative tasks still in progress."""
+        return sum(1 for task in self.tasks.values() if not task.done())
+
+    def start(self, key: str, factory: Callable[[], Awaitable[Any]],
+              on_unused: Callable[[], None] = None) -> Optional[asyncio.Task]:
+        """
+        Start factory() for key unless it is already known.
+
+        Speculation never queues: over budget (or with budget 0) nothing is
+        started and None is returned. on_unused is called if the result is
+        dropped without ever being used, to free what the task held.
+        """
+        if key in self.tasks:
+            self._touch(key)
+            return self.tasks[key]
+        if self.ttl <= 0 or self.running >= self.budget:
+            return None
+
+        task = asyncio.create_task(factory())
+        self.tasks[key] = task
+        if on_unused:
+            self._on_unused[key] = on_unused
+        self._touch(key)
+        logger.debug(f"Speculative task started: {key}")
+        return task
+
+    async def result(self, key: str, peek: bool = False) -> Any:
+        """
+        Wait for the task of key and return its result.
+
+        Returns None if nothing was started, or the task failed or was
+        cancelled. Using a result keeps it alive for another TTL; unless
+        peek is set, the caller also takes over what the task holds, so
+        on_unused is no longer called.
+        """
+        task = self.tasks.get(key)
+        if task is None:
+            return None
+        self._touch(key)
+        if not peek:
+            self._on_unused.pop(key, None)
+        # Waiting must not cancel the shared task if the caller is cancelled
+        await asyncio.wait([task])
+        if task.cancelled() or task.exception() is not None:
+            if not task.cancelled():
+                logger.info(f"Speculative task {key} failed: {task.exception()}")
+            self.discard(key)
+            return None
+        logger.info(f"Speculative result used: {key}")
+        return task.result()
+
+    def discard(self, key: str):
+        """Cancel and forget the task of key."""
+        task = self.tasks.pop(key, None)
+        on_unused = self._on_unused.pop(key, None)
+        if on_unused:
+            on_unused()
+        handle = self._expiry.pop(key, None)
+        if handle:
+            handle.cancel()
+        if task and not task.done():
+            task.cancel()
+
+    def _touch(self, key: str):
+        """Restart the idle TTL of key."""
+        handle = self._expiry.pop(key, None)
+        if handle:
+            handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._expiry[key] = loop.call_later(self.ttl, self._expire, key)
+
+    def _expire(self, key: str):
+        """Drop a result nobody asked for within the TTL."""
+        self._expiry.pop(key, None)
+        task = self.tasks.get(key)
+        if task and not task.done():
+            logger.info(f"Speculative task {key} unused after {self.ttl}s, cancelling")
+        self.discard(key)
+
+# Global speculative task registry
+speculative_tasks = SpeculativeTasks(config.SPECULATIVE_BUDGET, config.SPECULATIVE_TTL)
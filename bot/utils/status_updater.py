@@ -0,0 +1,156 @@
+"""
+Central updater for status messages.
+Coalesces progress edits per message to at most one per interval, skips
+unchanged text, spends edits from a global budget and backs off on FloodWait,
+so progress reporting doesn't burn API quota or slow down transfers.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from pyrogram.errors import FloodWait, MessageNotModified
+from pyrogram.types import Message
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class _MessageState:
+    """Edit bookkeeping for one status message."""
+
+    def __init__(self):
+        self.last_text: Optional[str] = None
+        self.last_edit = 0.0
+        self.pending: Optional[Tuple[str, object]] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.lock = asyncio.Lock()
+
+class StatusUpdater:
+    """Throttled, flood-aware editor for status messages."""
+
+    def __init__(self, interval: float, edits_per_second: float, max_flood_wait: int):
+        self.interval = interval
+        self.rate = edits_per_second
+        self.max_flood_wait = max_flood_wait
+        self.tokens = edits_per_second
+        self.refilled_at = time.monotonic()
+        self.flood_until = 0.0
+        self.states: Dict[Tuple[int, int], _MessageState] = {}
+
+    def update(self, message: Message, text: str, reply_markup=None):
+        """
+        Queue a progress edit without waiting for it.
+
+        Only the latest text is kept; it is sent when the message's interval,
+        the global budget and any FloodWait allow.
+        """
+        state = self.states.setdefault(self._key(message), _MessageState())
+        if text == state.last_text and state.pending is None:
+            return
+        state.pending = (text, reply_markup)
+        if state.timer is None:
+            delay = self._delay_for(state)
+            state.timer = asyncio.get_running_loop().call_later(
+                delay, lambda: asyncio.create_task(self._flush(message, state))
+            )
+
+    async def edit(self, message: Message, text: str, reply_markup=None) -> bool:
+        """
+        Edit a message right away, replacing any queued progress edit.
+
+        Used for state changes (errors, results) that must not be dropped.
+        Still waits out short FloodWaits and the global budget.
+        """
+        state = self.states.setdefault(self._key(message), _MessageState())
+        self._cancel_pending(state)
+        async with state.lock:
+            wait = max(self.flood_until - time.monotonic(), 0)
+            if wait > self.max_flood_wait:
+                logger.warning(f"Dropping status edit, flood wait of {wait:.0f}s in effect")
+                return False
+            if wait:
+                await asyncio.sleep(wait)
+            await self._take_token()
+            return await self._send(message, state, text, reply_markup, retry=True)
+
+    def forget(self, message: Message):
+        """Drop queued edits and state for a message that is finished or deleted."""
+        state = self.states.pop(self._key(message), None)
+        if state:
+            self._cancel_pending(state)
+
+    @staticmethod
+    def _key(message: Message) -> Tuple[int, int]:
+        return message.chat.id, message.id
+
+    def _cancel_pending(self, state: _MessageState):
+        state.pending = None
+        if state.timer:
+            state.timer.cancel()
+            state.timer = None
+
+    def _delay_for(self, state: _MessageState) -> float:
+        """Seconds until this message may be edited again."""
+        now = time.monotonic()
+        return max(state.last_edit + self.interval - now, self.flood_until - now, 0)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    async def _take_token(self):
+        """Wait for a token from the global edit budget."""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def _flush(self, message: Message, state: _MessageState):
+        """Send the latest queued edit for a message."""
+        state.timer = None
+        if state.pending is None or self.states.get(self._key(message)) is not state:
+            return
+
+        async with state.lock:
+            delay = self._delay_for(state)
+            self._refill()
+            if delay or self.tokens < 1:
+                # Not allowed yet: try again once the interval, FloodWait or budget allows
+                delay = delay or (1 - self.tokens) / self.rate
+                state.timer = asyncio.get_running_loop().call_later(
+                    delay, lambda: asyncio.create_task(self._flush(message, state))
+                )
+                return
+            text, reply_markup = state.pending
+            state.pending = None
+            if text == state.last_text:
+                return
+            self.tokens -= 1
+            await self._send(message, state, text, reply_markup)
+
+    async def _send(self, message: Message, state: _MessageState, text: str, reply_markup, retry: bool = False) -> bool:
+        """Perform one edit, recording FloodWaits for everyone."""
+        try:
+            await message.edit_text(text, reply_markup=reply_markup)
+        except MessageNotModified:
+            pass
+        except FloodWait as e:
+            self.flood_until = max(self.flood_until, time.monotonic() + e.value)
+            logger.warning(f"FloodWait of {e.value}s on status edits")
+            if retry and e.value <= self.max_flood_wait:
+                await asyncio.sleep(e.value)
+                return await self._send(message, state, text, reply_markup)
+            return False
+        except Exception as e:
+            logger.debug(f"Status edit failed for {self._key(message)}: {e}")
+            return False
+
+        state.last_text = text
+        state.last_edit = time.monotonic()
+        return True
+
+# Global status updater instance
+status_updater = StatusUpdater(config.STATUS_EDIT_INTERVAL, config.STATUS_EDITS_PER_SECOND, config.STATUS_MAX_FLOOD_WAIT)
@@ -0,0 +1,136 @@
+"""
+Thumbnail pipeline for uploads.
+Fetches the platform thumbnail (or grabs a frame with ffmpeg), converts it to
+a Telegram-compliant JPEG and caches it by canonical media ID.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional
+import requests
+from bot.config import config
+from bot.utils.logger import setup_logger
+from bot.utils.media import DownloadResult, run_ffmpeg
+
+logger = setup_logger(__name__)
+
+# Telegram limits for video thumbnails
+THUMB_MAX_SIDE = 320
+THUMB_MAX_BYTES = 200 * 1024
+
+class ThumbnailCache:
+    """Disk cache of ready-to-upload thumbnails keyed by media ID."""
+
+    def __init__(self, cache_dir: str, max_entries: int):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self._inflight: Dict[str, asyncio.Task] = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path_for(self, key: str) -> str:
+        """Cache file path for a media key."""
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.jpg")
+
+    async def get(self, result: DownloadResult) -> Optional[str]:
+        """Return a thumbnail path for a download, building it once per media ID."""
+        if not shutil.which("ffmpeg"):
+            return None
+
+        key = result.media_id or result.thumbnail_url or result.path
+        cached = self._path_for(key)
+        if os.path.exists(cached):
+            os.utime(cached)
+            return cached
+
+        # Concurrent requests for the same media share one build
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._build(result, cached))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Thumbnail generation failed for {key}: {e}")
+            return None
+
+    async def _build(self, result: DownloadResult, target: str) -> Optional[str]:
+        """Fetch or grab a source image and convert it into the cache."""
+        work_dir = tempfile.mkdtemp(prefix="thumb_")
+        try:
+            source = None
+            if result.thumbnail_url:
+                source = await asyncio.get_running_loop().run_in_executor(
+                    None, self._fetch, result.thumbnail_url, os.path.join(work_dir, "source")
+                )
+            if not source and result.path and os.path.exists(result.path):
+                source = await self._grab_frame(result, os.path.join(work_dir, "frame.jpg"))
+            if not source:
+                return None
+
+            if not await self._convert(source, target):
+                return None
+            self._evict()
+            logger.info(f"Cached thumbnail for {result.media_id or os.path.basename(result.path)}")
+            return target
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _fetch(self, url: str, destination: str) -> Optional[str]:
+        """Download the platform thumbnail (runs in executor)."""
+        try:
+            response = requests.get(url, timeout=config.THUMBNAIL_FETCH_TIMEOUT)
+            if response.status_code != 200 or not response.content:
+                logger.debug(f"Thumbnail fetch returned {response.status_code} for {url}")
+                return None
+            with open(destination, "wb") as f:
+                f.write(response.content)
+            return destination
+        except Exception as e:
+            logger.debug(f"Thumbnail fetch failed for {url}: {e}")
+            return None
+
+    async def _grab_frame(self, result: DownloadResult, destination: str) -> Optional[str]:
+        """Grab a frame from the video, a little way in to skip black intros."""
+        position = min(1.0, (result.duration or 0) / 10)
+        if await run_ffmpeg("-ss", f"{position:.2f}", "-i", result.path, "-frames:v", "1", destination):
+            return destination
+        return None
+
+    async def _convert(self, source: str, target: str) -> bool:
+        """Scale to fit 320x320 and encode a JPEG below Telegram's size limit."""
+        scale = f"scale={THUMB_MAX_SIDE}:{THUMB_MAX_SIDE}:force_original_aspect_ratio=decrease"
+        temp_target = f"{target}.tmp.jpg"
+        for quality in (3, 6, 10, 16):
+            if not await run_ffmpeg("-i", source, "-vf", scale, "-frames:v", "1", "-q:v", str(quality), temp_target):
+                return False
+            if os.path.getsize(temp_target) <= THUMB_MAX_BYTES:
+                os.replace(temp_target, target)
+                return True
+        os.remove(temp_target)
+        return False
+
+    def _evict(self):
+        """Keep the cache bounded, dropping the least recently used thumbnails."""
+        try:
+            entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir) if name.endswith(".jpg")]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+# Global thumbnail cache instance
+thumbnail_cache = ThumbnailCache(config.THUMBNAIL_CACHE_DIR, config.THUMBNAIL_CACHE_SIZE)
@@ -0,0 +1,126 @@
+"""
+CPU transcoding fallback for oversized videos.
+Re-encodes a video with ffmpeg at a bitrate computed from its duration and
+the upload limit. Transcodes run in their own bounded pool of ffmpeg worker
+processes with a separate wait queue; jobs give their download slot back
+while they wait for or run a transcode.
+"""
+
+import asyncio
+import os
+import shutil
+from typing import Awaitable, Callable, Optional
+from bot.config import config
+from bot.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ProgressCallback = Callable[[int], Awaitable[None]]
+
+class TranscodeQueueFull(Exception):
+    """Raised when too many transcodes are already waiting."""
+
+def target_video_bitrate(duration: float, limit_bytes: int, audio_kbps: int) -> int:
+    """
+    Video bitrate (kbit/s) that keeps the output under limit_bytes.
+
+    Leaves ~4% headroom for container overhead and encoder overshoot.
+    """
+    total_kbps = (limit_bytes * 8 / 1000) / max(duration, 1) * 0.96
+    return max(int(total_kbps - audio_kbps), 100)
+
+class Transcoder:
+    """Bounded pool of ffmpeg processes with its own queue."""
+
+    def __init__(self, workers: int, queue_size: int, threads: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.threads = threads
+        self.waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether transcoding is enabled and ffmpeg is installed."""
+        return config.TRANSCODE_ENABLED and shutil.which("ffmpeg") is not None
+
+    async def transcode(self, source: str, duration: float, limit_bytes: int,
+                        progress: ProgressCallback = None, on_start: Callable[[], None] = None) -> Optional[str]:
+        """
+        Re-encode source to fit limit_bytes, waiting for a free worker.
+
+        on_start is called once a worker is free, before encoding begins.
+        Returns the new file path, or None if the output could not be made small enough.
+        Raises TranscodeQueueFull when the wait queue is full.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._slots.locked() and self.waiting >= self.queue_size:
+            raise TranscodeQueueFull()
+
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            if on_start:
+                on_start()
+            output = f"{os.path.splitext(source)[0]}.transcoded.mp4"
+            bitrate = target_video_bitrate(duration, limit_bytes, config.TRANSCODE_AUDIO_KBPS)
+            # One retry at a lower bitrate if the encoder overshoots
+            for attempt in range(2):
+                logger.info(f"Transcoding {os.path.basename(source)} at {bitrate}k (attempt {attempt + 1})")
+                if not await self._run(source, output, bitrate, duration, progress):
+                    return None
+                if os.path.getsize(output) <= limit_bytes:
+                    return output
+                bitrate = int(bitrate * 0.85)
+            logger.warning(f"Transcoded file still exceeds {limit_bytes} bytes")
+            os.remove(output)
+            return None
+        finally:
+            self._slots.release()
+
+    async def _run(self, source: str, output: str, bitrate: int, duration: float,
+                   progress: ProgressCallback = None) -> bool:
+        """Run one ffmpeg encode, reporting progress from its -progress output."""
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", source,
+            "-c:v", "libx264", "-preset", config.TRANSCODE_PRESET,
+            "-b:v", f"{bitrate}k", "-maxrate", f"{bitrate}k", "-bufsize", f"{bitrate * 2}k",
+            "-threads", str(self.threads),
+            "-c:a", "aac", "-b:a", f"{config.TRANSCODE_AUDIO_KBPS}k",
+            "-movflags", "+faststart",
+            "-progress", "pipe:1", "-nostats",
+            output,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            async for raw_line in process.stdout:
+                line = raw_line.decode(errors="ignore").strip()
+                if progress and line.startswith("out_time_us=") and duration:
+                    try:
+                        done = int(line.split("=", 1)[1]) / 1_000_000
+                    except ValueError:
+                        continue
+                    await progress(min(99, int(done / duration * 100)))
+            stderr = await process.stderr.read()
+            await process.wait()
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            if os.path.exists(output):
+                os.remove(output)
+            raise
+
+        if process.returncode != 0:
+            logger.error(f"Transcode failed ({process.returncode}): {stderr.decode(errors='ignore')[-300:]}")
+            return False
+        return True
+
+# Global transcoder instance
+transcoder = Transcoder(config.TRANSCODE_WORKERS, config.TRANSCODE_QUEUE_SIZE, config.TRANSCODE_THREADS)
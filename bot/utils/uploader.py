@@ -0,0 +1,215 @@
+"""
+Upload helpers for the download plugins.
+Uploads videos and photos to Telegram without sending them, returning reusable file IDs,
+so several files can be uploaded concurrently and then sent together in order.
+Uploads can be spread over a pool of extra MTProto sessions of the same bot.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+from pyrogram import raw, StopTransmission
+from pyrogram.client import Client
+from pyrogram.file_id import FileId, FileType, ThumbnailSource
+from bot.config import config
+from bot.utils.logger import setup_logger
+from bot.utils.media import DownloadResult
+
+logger = setup_logger(__name__)
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+# Smaller uploads are dominated by round trips, not bandwidth
+MIN_THROUGHPUT_SAMPLE = 1024 * 1024
+
+class ThroughputTracker:
+    """Keeps a rolling window of recent upload speeds."""
+
+    def __init__(self, window: int = 20, min_samples: int = 3, max_age: float = 1800):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self.max_age = max_age
+
+    def add(self, size: int, seconds: float):
+        """Record one finished upload."""
+        if size >= MIN_THROUGHPUT_SAMPLE and seconds > 0:
+            self.samples.append((time.monotonic(), size, seconds))
+
+    def rate(self) -> Optional[float]:
+        """Recent bytes per second per upload, or None while there is too little data."""
+        cutoff = time.monotonic() - self.max_age
+        recent = [(size, seconds) for at, size, seconds in self.samples if at >= cutoff]
+        if len(recent) < self.min_samples:
+            return None
+        return sum(size for size, _ in recent) / sum(seconds for _, seconds in recent)
+
+class Uploader:
+    """Uploads media to Telegram under a global concurrency budget."""
+
+    def __init__(self, max_concurrent: int, pool_size: int = 0):
+        self.max_concurrent = max_concurrent
+        self.pool_size = pool_size
+        self.throughput = ThroughputTracker(config.THROUGHPUT_WINDOW)
+        self.sessions: List[Client] = []
+        self._active: Dict[int, int] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def has_pool(self) -> bool:
+        """Whether extra upload sessions are running."""
+        return bool(self.sessions)
+
+    async def start(self):
+        """Start the extra upload sessions (same bot token, separate session files)."""
+        for index in range(1, self.pool_size + 1):
+            session = Client(
+                name=f"{config.SESSION_NAME}_upload{index}",
+                api_id=int(config.API_ID),
+                api_hash=config.API_HASH,
+                bot_token=config.BOT_TOKEN,
+                no_updates=True,
+            )
+            try:
+                await session.start()
+            except Exception as e:
+                logger.error(f"Failed to start upload session {index}: {e}")
+                continue
+            self.sessions.append(session)
+        if self.sessions:
+            # Each session uploads its own files, so the budget grows with the pool
+            self.max_concurrent = max(self.max_concurrent, len(self.sessions) + 1)
+            logger.info(f"Started {len(self.sessions)} extra upload sessions")
+
+    async def stop(self):
+        """Stop the extra upload sessions."""
+        for session in self.sessions:
+            try:
+                await session.stop()
+            except Exception as e:
+                logger.warning(f"Error stopping upload session {session.name}: {e}")
+        self.sessions = []
+
+    def _pick_session(self, client: Client) -> Client:
+        """Pick the session with the fewest uploads in flight."""
+        candidates = [client] + self.sessions
+        return min(candidates, key=lambda session: self._active.get(id(session), 0))
+
+    async def _upload_media(self, client: Client, chat_id: int, build_media):
+        """
+        Upload through the least busy session and return the raw MessageMedia.
+
+        build_media(session) saves the files on that session and returns the
+        InputMedia to register.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        async with self._slots:
+            session = self._pick_session(client)
+            self._active[id(session)] = self._active.get(id(session), 0) + 1
+            try:
+                # Uploaded parts belong to the session that sent them, so the
+                # whole upload runs there; the peer comes from the main client
+                peer = await client.resolve_peer(chat_id)
+                media = await build_media(session)
+                return await session.invoke(raw.functions.messages.UploadMedia(peer=peer, media=media)), session
+            finally:
+                self._active[id(session)] -= 1
+
+    async def upload_video(self, client: Client, chat_id: int, result: DownloadResult,
+                           progress: ProgressCallback = None) -> str:
+        """
+        Upload a video for chat_id and return its file ID for sending.
+
+        The file may be uploaded over a pooled session; the returned file ID
+        belongs to the bot account, so the main client can send it.
+        """
+        async def build_media(session: Client):
+            file = await session.save_file(result.path, progress=progress)
+            thumb = None
+            if result.thumbnail_path and os.path.exists(result.thumbnail_path):
+                thumb = await session.save_file(result.thumbnail_path)
+            return raw.types.InputMediaUploadedDocument(
+                mime_type="video/mp4",
+                file=file,
+                thumb=thumb,
+                attributes=[
+                    raw.types.DocumentAttributeVideo(
+                        duration=int(result.duration or 0),
+                        w=int(result.width or 0),
+                        h=int(result.height or 0),
+                        supports_streaming=True,
+                    ),
+                    raw.types.DocumentAttributeFilename(file_name=os.path.basename(result.path)),
+                ],
+            )
+
+        started = time.monotonic()
+        media, session = await self._upload_media(client, chat_id, build_media)
+        self.throughput.add(result.size, time.monotonic() - started)
+        document = media.document
+        logger.info(f"Uploaded {os.path.basename(result.path)} ({result.size} bytes) via {session.name}")
+        return FileId(
+            file_type=FileType.VIDEO,
+            dc_id=document.dc_id,
+            media_id=document.id,
+            access_hash=document.access_hash,
+            file_reference=document.file_reference,
+        ).encode()
+
+    async def upload_photo(self, client: Client, chat_id: int, path: str) -> str:
+        """Upload a photo for chat_id and return its file ID for sending."""
+        async def build_media(session: Client):
+            return raw.types.InputMediaUploadedPhoto(file=await session.save_file(path))
+
+        media, session = await self._upload_media(client, chat_id, build_media)
+        photo = media.photo
+        sizes = [size for size in photo.sizes if isinstance(size, (raw.types.PhotoSize, raw.types.PhotoSizeProgressive))]
+        largest = max(sizes, key=lambda size: size.size if isinstance(size, raw.types.PhotoSize) else max(size.sizes))
+        logger.info(f"Uploaded photo {os.path.basename(path)} via {session.name}")
+        return FileId(
+            file_type=FileType.PHOTO,
+            dc_id=photo.dc_id,
+            media_id=photo.id,
+            access_hash=photo.access_hash,
+            file_reference=photo.file_reference,
+            thumbnail_source=ThumbnailSource.THUMBNAIL,
+            thumbnail_file_type=FileType.PHOTO,
+            thumbnail_size=largest.type,
+            volume_id=0,
+            local_id=0,
+        ).encode()
+
+    async def send_video(self, client: Client, chat_id: int, result: DownloadResult, caption: str = None,
+                         progress: ProgressCallback = None):
+        """
+        Send a video, uploading it over the session pool when one is running.
+
+        Without a pool this is a plain send_video on the main client.
+        """
+        if not self.has_pool:
+            started = time.monotonic()
+            sent = await client.send_video(
+                chat_id=chat_id,
+                video=result.path,
+                caption=caption,
+                progress=progress,
+                **result.video_kwargs()
+            )
+            if sent:
+                self.throughput.add(result.size, time.monotonic() - started)
+            return sent
+
+        try:
+            file_id = await self.upload_video(client, chat_id, result, progress)
+        except StopTransmission:
+            # Same behaviour as Pyrogram's own send_video on stop_transmission()
+            return None
+        kwargs = result.video_kwargs()
+        kwargs.pop("thumb", None)
+        return await client.send_video(chat_id=chat_id, video=file_id, caption=caption, **kwargs)
+
+# Global uploader instance
+uploader = Uploader(config.UPLOAD_CONCURRENCY, config.UPLOAD_SESSIONS)